@@ -0,0 +1,291 @@
+"""
+Client asyncio pour GitHub + jsDelivr Video Uploader
+AsyncVideoUploader / AsyncVideoManager : mêmes validation, nommage et URLs que
+les classes synchrones, sur une session aiohttp avec pool de connexions
+"""
+
+import os
+import json
+import base64
+import asyncio
+import aiohttp
+from config import Config, DEFAULT_CONFIG
+from upload_video import VideoUploader, retry_delay
+from video_layout import VideoLayout
+
+# Taille des blocs lus pour l'encodage base64 en streaming (multiple de 3)
+STREAM_CHUNK_SIZE = 3 * 256 * 1024
+
+# Nombre de tentatives quand deux commits concurrents se croisent (409)
+CONFLICT_RETRIES = 3
+
+
+def create_session(config, user_agent, pool_size):
+    """Crée une session aiohttp authentifiée avec un pool de connexions"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=pool_size),
+        headers={
+            'Authorization': f'token {config.github_token}',
+            'User-Agent': user_agent,
+        },
+    )
+
+
+async def _stream_contents_body(video_path, data):
+    """Génère le corps JSON de l'API Contents sans charger la vidéo en mémoire"""
+    prefix = json.dumps(data)[:-1] + ', "content": "'
+    yield prefix.encode('utf-8')
+    with open(video_path, 'rb') as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield base64.b64encode(chunk)
+    yield b'"}'
+
+
+class AsyncVideoUploader:
+    """Version asyncio de VideoUploader
+
+    Les étapes locales (validation, nommage, faststart, snippets) réutilisent
+    VideoUploader ; les appels réseau passent par une session aiohttp partagée.
+    """
+
+    def __init__(self, pool_size=10):
+        self.config = Config()
+        self.layout = VideoLayout(self.config.video_layout)
+        self.pool_size = pool_size
+        self.session = None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def open(self):
+        """Ouvre la session HTTP (appelé automatiquement au besoin)"""
+        if self.session is None or self.session.closed:
+            self.session = create_session(self.config, 'GitHub-jsDelivr-Video-Uploader',
+                                          self.pool_size)
+        return self.session
+
+    async def close(self):
+        """Ferme la session HTTP"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def contents_url(self, filename):
+        return (f"{self.config.github_api_url}/repos/{self.config.github_username}/"
+                f"{self.config.github_repo}/contents/{self.layout.path(filename)}")
+
+    def generate_jsdelivr_url(self, filename):
+        """Génère l'URL jsDelivr"""
+        return self.layout.cdn_url(self.config.jsdelivr_base_url,
+                                   self.config.github_username,
+                                   self.config.github_repo, filename)
+
+    async def upload_to_github(self, video_path, filename):
+        """Upload la vidéo vers GitHub (corps JSON streamé)"""
+        session = self.open()
+        url = self.contents_url(filename)
+
+        for attempt in range(1, CONFLICT_RETRIES + 1):
+            data = {
+                'message': f"Add video: {filename}",
+                'branch': DEFAULT_CONFIG['github_branch'],
+            }
+
+            # Vérifier si le fichier existe déjà
+            async with session.get(url) as existing:
+                if existing.status == 200:
+                    data['sha'] = (await existing.json())['sha']
+
+            headers = {'Content-Type': 'application/json'}
+            body = _stream_contents_body(video_path, data)
+            async with session.put(url, data=body, headers=headers) as response:
+                if response.status in (200, 201):
+                    return True
+                if response.status == 409 and attempt < CONFLICT_RETRIES:
+                    # Commit concurrent sur la branche : réessayer
+                    await asyncio.sleep(retry_delay(attempt - 1))
+                    continue
+                text = await response.text()
+                raise RuntimeError(f"Erreur upload {filename}: {response.status} "
+                                   f"{text[:200]}")
+        return False
+
+    async def upload(self, video_path, allow_duplicates=False):
+        """Valide, nomme et uploade une vidéo, retourne un dict résultat
+
+        Mêmes étapes que VideoUploader.upload (SHA source, quasi-doublons,
+        catalogue, index d'empreintes). Les opérations disque bloquantes
+        tournent dans un thread pour ne pas bloquer la boucle d'événements.
+        """
+        # Une instance par upload : validate_video mémorise les métadonnées
+        uploader = VideoUploader()
+
+        hashes = await asyncio.to_thread(uploader.prepare_upload, video_path)
+        if uploader.duplicates and not allow_duplicates:
+            duplicate = uploader.duplicates[0]['name']
+            raise ValueError(f"❌ Quasi-doublon de {duplicate} "
+                             "(allow_duplicates pour uploader)")
+        filename = await asyncio.to_thread(uploader.generate_filename, video_path)
+        upload_path = await asyncio.to_thread(uploader.prepare_faststart, video_path)
+        try:
+            await self.upload_to_github(upload_path, filename)
+        finally:
+            if upload_path != video_path:
+                os.remove(upload_path)
+
+        await asyncio.to_thread(uploader.finish_upload, filename, hashes)
+        return {
+            'filename': filename,
+            'url': self.generate_jsdelivr_url(filename),
+            'metadata': uploader.metadata,
+            'duplicates': uploader.duplicates,
+            'snippets': uploader.generate_snippets(filename),
+        }
+
+    async def upload_many(self, video_paths, concurrency=4, allow_duplicates=False):
+        """Uploade plusieurs vidéos en parallèle
+
+        Retourne une liste alignée sur video_paths : dict résultat ou exception.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(path):
+            async with semaphore:
+                return await self.upload(path, allow_duplicates)
+
+        return await asyncio.gather(*(bounded(path) for path in video_paths),
+                                    return_exceptions=True)
+
+
+class AsyncVideoManager:
+    """Version asyncio de VideoManager (sans affichage ni presse-papier)"""
+
+    def __init__(self, pool_size=10):
+        self.config = Config()
+        self.layout = VideoLayout(self.config.video_layout)
+        self.pool_size = pool_size
+        self.session = None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def open(self):
+        """Ouvre la session HTTP (appelé automatiquement au besoin)"""
+        if self.session is None or self.session.closed:
+            self.session = create_session(self.config, 'GitHub-jsDelivr-Video-Manager',
+                                          self.pool_size)
+        return self.session
+
+    async def close(self):
+        """Ferme la session HTTP"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def repo_url(self, path):
+        return (f"{self.config.github_api_url}/repos/{self.config.github_username}/"
+                f"{self.config.github_repo}/{path}")
+
+    async def fetch_folder(self, folder='videos'):
+        """Contenu brut d'un dossier du repository (None s'il n'existe pas)"""
+        async with self.open().get(self.repo_url(f"contents/{folder}")) as response:
+            if response.status == 404:
+                return None
+            if response.status != 200:
+                raise RuntimeError(f"Erreur API: {response.status}")
+            return [item for item in await response.json()
+                    if item.get('type', 'file') == 'file']
+
+    async def get_branch_sha(self, branch='main'):
+        """SHA du dernier commit de la branche"""
+        headers = {'Accept': 'application/vnd.github.sha'}
+        url = self.repo_url(f"commits/{branch}")
+        async with self.open().get(url, headers=headers) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Impossible de lire la branche {branch}: "
+                                   f"{response.status}")
+            return (await response.text()).strip()
+
+    async def list_videos(self, branch='main'):
+        """Liste les vidéos uploadées, toutes organisations (API Git Trees récursive)"""
+        url = self.repo_url(f"git/trees/{branch}")
+        async with self.open().get(url, params={'recursive': 1}) as response:
+            if response.status in (404, 409):
+                return []
+            if response.status != 200:
+                raise RuntimeError(f"Erreur API: {response.status}")
+            tree = await response.json()
+        videos = [
+            {'name': item['path'].rsplit('/', 1)[-1], 'path': item['path'],
+             'size': item.get('size', 0), 'sha': item['sha'], 'type': 'file'}
+            for item in tree['tree']
+            if item['type'] == 'blob' and self.layout.is_video_path(item['path'])
+        ]
+        return sorted(videos, key=lambda video: video['name'])
+
+    async def locate(self, filename):
+        """Chemin réel d'une vidéo : celui du résolveur, sinon celui du listing"""
+        path = self.layout.path(filename)
+        async with self.open().get(self.repo_url(f"contents/{path}")) as response:
+            if response.status == 200:
+                return path
+        for video in await self.list_videos():
+            if video['name'] == filename:
+                return video['path']
+        return None
+
+    async def delete_video(self, filename):
+        """Supprime une vidéo, retourne True si elle a été supprimée"""
+        session = self.open()
+        path = await self.locate(filename)
+        if path is None:
+            return False
+        url = self.repo_url(f"contents/{path}")
+
+        for attempt in range(1, CONFLICT_RETRIES + 1):
+            async with session.get(url) as response:
+                if response.status != 200:
+                    return False
+                sha = (await response.json())['sha']
+
+            delete_data = {
+                'message': f"Delete video: {filename}",
+                'sha': sha,
+                'branch': DEFAULT_CONFIG['github_branch'],
+            }
+            async with session.delete(url, json=delete_data) as response:
+                if response.status == 200:
+                    return True
+                if response.status == 409 and attempt < CONFLICT_RETRIES:
+                    await asyncio.sleep(retry_delay(attempt - 1))
+                    continue
+                raise RuntimeError(f"Erreur suppression {filename}: {response.status}")
+        return False
+
+    async def delete_many(self, filenames, concurrency=4):
+        """Supprime plusieurs vidéos en parallèle"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(filename):
+            async with semaphore:
+                return await self.delete_video(filename)
+
+        return await asyncio.gather(*(bounded(name) for name in filenames),
+                                    return_exceptions=True)
+
+    def get_video_url(self, filename):
+        """URL jsDelivr d'une vidéo"""
+        return self.layout.cdn_url(self.config.jsdelivr_base_url,
+                                   self.config.github_username,
+                                   self.config.github_repo, filename)
@@ -0,0 +1,188 @@
+"""
+Journal d'écriture anticipée pour les opérations par lot
+Chaque étape distante (blob, commit, suppression) est annoncée dans le journal avant
+d'être lancée, puis marquée terminée, avec fsync : une relance sait exactement où le
+lot s'est arrêté et ce qui était en cours
+"""
+
+import os
+import json
+import time
+import tempfile
+from pathlib import Path
+
+DEFAULT_UPLOAD_JOURNAL = os.getenv('UPLOAD_JOURNAL', 'upload_journal.jsonl')
+DEFAULT_DELETE_JOURNAL = os.getenv('DELETE_JOURNAL', 'delete_journal.jsonl')
+
+# Étapes dans l'ordre d'un upload, puis étape finale d'une suppression
+UPLOAD_STEPS = ('hashed', 'blob', 'committed', 'snippet')
+DELETE_STEPS = ('deleted',)
+
+STATUS_ICONS = {'done': '✅', 'in_flight': '⏳', 'failed': '❌'}
+
+# Compaction dès que le journal dépasse ce nombre de lignes et 4 lignes par élément
+COMPACT_MIN_LINES = 1000
+
+# Les éléments terminés depuis plus longtemps sont oubliés à la compaction
+RETENTION_DAYS = 30
+
+
+class BatchJournal:
+    def __init__(self, path=DEFAULT_UPLOAD_JOURNAL, steps=UPLOAD_STEPS):
+        self.path = Path(path)
+        self.steps = steps
+        self.entries = {}
+        self.lines = 0
+        # Éléments du lot en cours (écrits ou retrouvés par ce processus)
+        self.batch_keys = set()
+        self.load()
+
+    def load(self):
+        """Rejoue le journal (une dernière ligne tronquée par un crash est ignorée)"""
+        self.entries = {}
+        self.lines = 0
+        if not self.path.exists():
+            return self.entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                self.lines += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.apply(record)
+        return self.entries
+
+    def apply(self, record):
+        entry = self.entries.setdefault(record['key'], {
+            'key': record['key'], 'steps': {}, 'error': None, 'intent': None,
+        })
+        if record['step'] == 'failed':
+            entry['error'] = record.get('error')
+            entry['intent'] = None
+        elif record['step'] == 'begin':
+            entry['intent'] = record['data']['step']
+        elif record['step'] == 'snapshot':
+            entry.update(record['data'])
+        else:
+            entry['steps'][record['step']] = record.get('data', {})
+            entry['error'] = None
+            entry['intent'] = None
+        entry['updated'] = record['ts']
+
+    def append(self, key, step, data=None, error=None):
+        """Ajoute une étape au journal et la force sur le disque"""
+        record = {'ts': time.time(), 'key': key, 'step': step}
+        if data:
+            record['data'] = data
+        if error:
+            record['error'] = error
+        if self.path.parent != Path(''):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.lines += 1
+        self.batch_keys.add(key)
+        self.apply(record)
+        if self.lines > max(COMPACT_MIN_LINES, 4 * len(self.entries)):
+            self.compact()
+
+    def begin(self, key, step, **data):
+        """Annonce une étape avant de la lancer (en cours après un crash)"""
+        self.append(key, 'begin', {'step': step, **data})
+
+    def record(self, key, step, **data):
+        """Marque une étape comme terminée"""
+        self.append(key, step, data)
+
+    def fail(self, key, error):
+        """Marque un élément en échec (ses étapes terminées restent acquises)"""
+        self.append(key, 'failed', error=str(error))
+
+    def forget(self, keys):
+        """Retire des éléments du journal (lot terminé) et le réécrit"""
+        for key in keys:
+            self.entries.pop(key, None)
+        self.compact()
+
+    def compact(self, retention_days=RETENTION_DAYS):
+        """Réécrit le journal avec une ligne par élément
+
+        Les éléments terminés depuis plus de retention_days sont oubliés :
+        le journal ne grossit plus indéfiniment.
+        """
+        cutoff = time.time() - retention_days * 86400
+        for key in list(self.entries):
+            if self.status(key) == 'done' and self.entries[key]['updated'] < cutoff:
+                del self.entries[key]
+
+        if self.path.parent != Path(''):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.path.parent,
+                                         prefix=self.path.name + '.', suffix='.tmp',
+                                         delete=False) as f:
+            for key, entry in self.entries.items():
+                data = {name: entry[name] for name in ('steps', 'error', 'intent')}
+                record = {'ts': entry['updated'], 'key': key, 'step': 'snapshot',
+                          'data': data}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f.name, self.path)
+        self.lines = len(self.entries)
+
+    def step(self, key, step):
+        """Données d'une étape terminée, ou None"""
+        entry = self.entries.get(key)
+        return entry['steps'].get(step) if entry else None
+
+    def find(self, **criteria):
+        """Clé du premier élément dont l'étape 'hashed' correspond aux critères"""
+        for key, entry in self.entries.items():
+            hashed = entry['steps'].get(self.steps[0], {})
+            if hashed and all(hashed.get(name) == value
+                              for name, value in criteria.items()):
+                self.batch_keys.add(key)
+                return key
+        return None
+
+    def status(self, key):
+        """done, in_flight ou failed"""
+        entry = self.entries[key]
+        if entry['error']:
+            return 'failed'
+        return 'done' if self.steps[-1] in entry['steps'] else 'in_flight'
+
+    def select(self, keys=None):
+        """Entrées des clés données (tout le journal si keys vaut None)"""
+        if keys is None:
+            return dict(self.entries)
+        return {key: self.entries[key] for key in keys if key in self.entries}
+
+    def summary(self, keys=None):
+        """Éléments regroupés par statut (limités à `keys` si donné)"""
+        groups = {'done': [], 'in_flight': [], 'failed': []}
+        for key in self.select(keys):
+            groups[self.status(key)].append(key)
+        return groups
+
+    def format_report(self, keys=None):
+        """Rapport texte : une ligne par élément avec sa dernière étape"""
+        entries = self.select(keys)
+        lines = []
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]['updated']):
+            status = self.status(key)
+            last = next((step for step in reversed(self.steps)
+                         if step in entry['steps']), '-')
+            if entry['intent'] and status == 'in_flight':
+                last = f"→{entry['intent']}"
+            error = f" ({entry['error']})" if entry['error'] else ""
+            lines.append(f"{STATUS_ICONS[status]} {status:<9} {last:<9} {key}{error}")
+        groups = self.summary(keys)
+        lines.append("")
+        lines.append(f"📊 {len(entries)} élément(s): {len(groups['done'])} terminé(s), "
+                     f"{len(groups['in_flight'])} en cours, "
+                     f"{len(groups['failed'])} en échec")
+        return "\n".join(lines)
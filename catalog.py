@@ -0,0 +1,111 @@
+"""
+Catalogue local des vidéos GitHub + jsDelivr
+Conserve les métadonnées de chaque vidéo (taille, SHA, référence épinglée...)
+"""
+
+import os
+import json
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+DEFAULT_CATALOG_PATH = os.getenv('VIDEO_CATALOG', 'catalog.json')
+
+# Un verrou par fichier, partagé par toutes les instances (requêtes web parallèles)
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+def file_lock(path):
+    """Verrou des fichiers JSON locaux (catalogue, index d'empreintes)"""
+    with _file_locks_guard:
+        return _file_locks.setdefault(os.path.abspath(path), threading.RLock())
+
+
+def write_json_atomic(path, data, **options):
+    """Écrit un fichier JSON via un fichier temporaire unique puis os.replace"""
+    path = Path(path)
+    if path.parent != Path(''):
+        path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=path.parent,
+                                     prefix=path.name + '.', suffix='.tmp',
+                                     delete=False) as f:
+        json.dump(data, f, **options)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+class VideoCatalog:
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = Path(path)
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        """Charge le catalogue depuis le disque (vide s'il n'existe pas)"""
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('videos', {})
+        return self.entries
+
+    def save(self):
+        """Sauvegarde le catalogue de manière atomique"""
+        write_json_atomic(self.path, {'videos': self.entries}, indent=2,
+                          sort_keys=True, ensure_ascii=False)
+
+    @contextmanager
+    def edit(self):
+        """Recharge, laisse modifier puis sauvegarde le catalogue sous verrou
+
+        Deux écrivains concurrents ne perdent pas leurs entrées respectives.
+        """
+        with file_lock(self.path):
+            self.load()
+            yield self
+            self.save()
+
+    def get(self, name):
+        """Retourne l'entrée d'une vidéo (ou None)"""
+        return self.entries.get(name)
+
+    def update(self, name, **fields):
+        """Crée ou met à jour l'entrée d'une vidéo"""
+        entry = self.entries.setdefault(name, {'name': name})
+        entry.update(fields)
+        return entry
+
+    def remove(self, name):
+        """Supprime une vidéo du catalogue"""
+        return self.entries.pop(name, None)
+
+    def sync(self, videos):
+        """Synchronise le catalogue avec un listing GitHub (name, path, size, sha)
+
+        Les vidéos absentes du listing sont retirées, les métadonnées locales
+        des vidéos inchangées sont conservées. Une vidéo dont le SHA ou le
+        chemin a changé (réencodage, migration d'organisation) perd sa
+        référence épinglée : l'ancien commit ne contient pas le nouveau chemin.
+        """
+        names = set()
+        for video in videos:
+            name = video['name']
+            names.add(name)
+            entry = self.entries.get(name)
+            moved = entry and entry.get('path') != video.get('path')
+            if entry and (entry.get('sha') != video['sha'] or moved):
+                entry.pop('pinned_ref', None)
+            self.update(name, size=video['size'], sha=video['sha'],
+                        path=video.get('path'))
+
+        for name in list(self.entries):
+            if name not in names:
+                del self.entries[name]
+        return self.videos()
+
+    def videos(self):
+        """Liste des entrées triées par nom"""
+        return [self.entries[name] for name in sorted(self.entries)]
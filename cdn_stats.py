@@ -0,0 +1,176 @@
+"""
+Statistiques de trafic jsDelivr
+Récupère les hits et la bande passante par fichier (API data.jsdelivr.com),
+les croise avec le catalogue local et classe les vidéos par octets servis
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from video_layout import resolve_redirect
+
+DEFAULT_STATS_CACHE = os.getenv('STATS_CACHE', 'stats_cache.json')
+
+# Périodes acceptées par l'API jsDelivr
+PERIODS = ('day', 'week', 'month', 'quarter', 'year')
+
+# Taille de page maximale de l'API
+PAGE_LIMIT = 100
+
+REQUEST_TIMEOUT = 30
+
+# Débit cible utilisé pour estimer le gain d'un réencodage
+DEFAULT_TARGET_BITRATE = 1_500_000
+
+
+def fetch_file_stats(session, stats_url, username, repo, ref, period='month'):
+    """Hits et bande passante par fichier pour une version (branche ou commit)
+
+    Retourne {chemin: {'hits': n, 'bandwidth': octets}} avec des chemins
+    relatifs au repository (sans '/' initial).
+    """
+    url = f"{stats_url.rstrip('/')}/stats/packages/gh/{username}/{repo}@{ref}/files"
+    files = {}
+    page = 1
+    while True:
+        params = {'period': period, 'page': page, 'limit': PAGE_LIMIT}
+        response = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 404:
+            # Version jamais servie par jsDelivr
+            return files
+        if response.status_code != 200:
+            raise RuntimeError(f"Statistiques jsDelivr indisponibles ({ref}): "
+                               f"{response.status_code}")
+        items = response.json()
+        for item in items:
+            path = item['name'].lstrip('/')
+            files[path] = {'hits': item['hits']['total'],
+                           'bandwidth': item['bandwidth']['total']}
+        if len(items) < PAGE_LIMIT:
+            return files
+        page += 1
+
+
+class StatsCache:
+    """Cache local des réponses de l'API, expiré après `ttl` secondes"""
+
+    def __init__(self, path=DEFAULT_STATS_CACHE, ttl=None):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def get(self, key):
+        """Statistiques en cache encore valides (ou None)"""
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        if self.ttl is not None and time.time() - entry['fetched_at'] > self.ttl:
+            return None
+        return entry
+
+    def put(self, key, files):
+        self.entries[key] = {'fetched_at': time.time(), 'files': files}
+        return self.entries[key]
+
+    def save(self):
+        """Sauvegarde le cache de manière atomique"""
+        if self.path.parent != Path(''):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def merge_stats(stats_by_ref, redirects=None):
+    """Additionne les statistiques de plusieurs versions par chemin actuel
+
+    Les anciens chemins (avant une migration d'organisation) sont ramenés à
+    leur chemin actuel via la table des redirections.
+    """
+    merged = {}
+    for files in stats_by_ref:
+        for path, stats in files.items():
+            path = resolve_redirect(path, redirects or {})
+            total = merged.setdefault(path, {'hits': 0, 'bandwidth': 0})
+            total['hits'] += stats['hits']
+            total['bandwidth'] += stats['bandwidth']
+    return merged
+
+
+def rank_videos(stats, videos, catalog, target_bitrate=DEFAULT_TARGET_BITRATE):
+    """Classe les vidéos du repository par octets servis
+
+    `videos` est un listing GitHub (name, path, size), `catalog` les entrées
+    du catalogue local (bitrate, duration). Le gain projeté suppose un
+    réencodage à `target_bitrate` : il vaut la bande passante servie multipliée
+    par la part de taille économisée (None si la durée est inconnue).
+    """
+    ranking = []
+    for video in videos:
+        served = stats.get(video['path'], {'hits': 0, 'bandwidth': 0})
+        entry = catalog.get(video['name']) or {}
+        duration = entry.get('duration')
+        bitrate = entry.get('bitrate') or (int(video['size'] * 8 / duration)
+                                           if duration else None)
+
+        projected_size = None
+        savings = None
+        if duration:
+            projected_size = min(video['size'], int(target_bitrate * duration / 8))
+            ratio = 1 - projected_size / video['size'] if video['size'] else 0
+            savings = int(served['bandwidth'] * ratio)
+
+        ranking.append({
+            'name': video['name'],
+            'path': video['path'],
+            'hits': served['hits'],
+            'bandwidth': served['bandwidth'],
+            'size': video['size'],
+            'bitrate': bitrate,
+            'duration': duration,
+            'projected_size': projected_size,
+            'projected_savings': savings,
+        })
+
+    ranking.sort(key=lambda r: (-r['bandwidth'], -(r['projected_savings'] or 0),
+                                r['name']))
+    return ranking
+
+
+def format_size(size):
+    if size is None:
+        return '—'
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.1f} GB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def format_report(ranking, period, target_bitrate=DEFAULT_TARGET_BITRATE):
+    """Rapport texte, une ligne par vidéo puis les totaux"""
+    lines = [f"{'#':>3}  {'servis':>9}  {'hits':>8}  {'taille':>8}  "
+             f"{'débit':>10}  {'gain':>9}  vidéo"]
+    for rank, row in enumerate(ranking, 1):
+        bitrate = f"{row['bitrate'] / 1000:.0f} kbit/s" if row['bitrate'] else '—'
+        lines.append(f"{rank:>3}  {format_size(row['bandwidth']):>9}  "
+                     f"{row['hits']:>8}  "
+                     f"{format_size(row['size']):>8}  {bitrate:>10}  "
+                     f"{format_size(row['projected_savings']):>9}  {row['name']}")
+
+    served = sum(row['bandwidth'] for row in ranking)
+    savings = sum(row['projected_savings'] or 0 for row in ranking)
+    unknown = sum(1 for row in ranking if row['projected_savings'] is None)
+    lines.append("")
+    lines.append(f"📊 {len(ranking)} vidéo(s), {format_size(served)} "
+                 f"servis sur la période ({period})")
+    lines.append(f"🗜️ Gain projeté à {target_bitrate / 1000:.0f} kbit/s: "
+                 f"{format_size(savings)}"
+                 + (f" ({unknown} vidéo(s) sans durée connue)" if unknown else ""))
+    return "\n".join(lines)
@@ -0,0 +1,145 @@
+"""
+Vérification des URLs jsDelivr
+Requêtes HEAD + Range concurrentes pour détecter les vidéos manquantes,
+obsolètes ou lentes
+"""
+
+import re
+import time
+import asyncio
+import aiohttp
+
+# Octets demandés pour mesurer le temps jusqu'au premier octet
+RANGE_BYTES = 1024
+
+REQUEST_TIMEOUT = 30
+
+# Ordre de tri par gravité
+STATUS_ORDER = {'error': 0, 'missing': 1, 'stale': 2, 'slow': 3, 'ok': 4}
+
+STATUS_ICONS = {'ok': '✅', 'slow': '🐢', 'stale': '♻️', 'missing': '❌', 'error': '⚠️'}
+
+SORT_KEYS = {
+    'status': lambda r: (STATUS_ORDER[r['status']], r['name']),
+    'ttfb': lambda r: (-(r['ttfb'] or 0), r['name']),
+    'name': lambda r: r['name'],
+    'size': lambda r: (-r['expected_size'], r['name']),
+}
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes \d+-\d+/(\d+)')
+HEX_SHA_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+
+
+def normalize_etag(etag):
+    """Retire le préfixe faible W/ et les guillemets d'un ETag"""
+    if not etag:
+        return None
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    return etag.strip('"')
+
+
+async def check_video(session, semaphore, entry, url, slow_threshold):
+    """Vérifie une URL : présence, taille, ETag et temps jusqu'au premier octet"""
+    result = {
+        'name': entry['name'],
+        'url': url,
+        'expected_size': entry['size'],
+        'sha': entry['sha'],
+        'http_status': None,
+        'content_length': None,
+        'etag': None,
+        'ttfb': None,
+        'range_supported': None,
+        'status': 'ok',
+        'problems': [],
+    }
+
+    async with semaphore:
+        try:
+            async with session.head(url, allow_redirects=True) as response:
+                result['http_status'] = response.status
+                if response.status >= 400:
+                    result['status'] = 'missing'
+                    result['problems'].append(f"HTTP {response.status}")
+                    return result
+                if 'Content-Length' in response.headers:
+                    result['content_length'] = int(response.headers['Content-Length'])
+                result['etag'] = normalize_etag(response.headers.get('ETag'))
+
+            start = time.monotonic()
+            range_header = {'Range': f'bytes=0-{RANGE_BYTES - 1}'}
+            async with session.get(url, headers=range_header) as response:
+                result['ttfb'] = time.monotonic() - start
+                await response.content.read(RANGE_BYTES)
+                result['range_supported'] = response.status == 206
+                content_range = response.headers.get('Content-Range', '')
+                match = CONTENT_RANGE_PATTERN.match(content_range)
+                if match:
+                    result['content_length'] = int(match.group(1))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result['status'] = 'error'
+            result['problems'].append(str(e) or type(e).__name__)
+            return result
+
+    length = result['content_length']
+    if length is not None and length != entry['size']:
+        result['status'] = 'stale'
+        result['problems'].append(f"taille {length} ≠ {entry['size']}")
+    # Un ETag au format SHA git doit correspondre au blob attendu
+    etag = result['etag']
+    if etag and HEX_SHA_PATTERN.match(etag) and etag != entry['sha']:
+        result['status'] = 'stale'
+        result['problems'].append(f"ETag {result['etag'][:8]} ≠ SHA {entry['sha'][:8]}")
+    if result['range_supported'] is False:
+        result['problems'].append("requêtes Range non supportées")
+    if result['status'] == 'ok' and result['ttfb'] > slow_threshold:
+        result['status'] = 'slow'
+        result['problems'].append(f"TTFB {result['ttfb'] * 1000:.0f} ms")
+    return result
+
+
+async def verify_videos(entries, url_for, concurrency=8, slow_threshold=1.0,
+                        timeout=REQUEST_TIMEOUT):
+    """Vérifie toutes les vidéos avec une concurrence bornée
+
+    `entries` sont des entrées de listing (name, size, sha), `url_for`
+    construit l'URL à vérifier depuis un nom de fichier.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timeout = aiohttp.ClientTimeout(total=timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    headers = {'User-Agent': 'GitHub-jsDelivr-Video-Verifier'}
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                     headers=headers) as session:
+        return await asyncio.gather(*(
+            check_video(session, semaphore, entry, url_for(entry['name']),
+                        slow_threshold)
+            for entry in entries
+        ))
+
+
+def sort_results(results, sort_by='status'):
+    """Trie le rapport (status, ttfb, name ou size)"""
+    return sorted(results, key=SORT_KEYS[sort_by])
+
+
+def format_report(results):
+    """Rapport texte, une ligne par vidéo puis un résumé"""
+    lines = []
+    for result in results:
+        ttfb = "     - ms"
+        if result['ttfb'] is not None:
+            ttfb = f"{result['ttfb'] * 1000:6.0f} ms"
+        problems = f" ({', '.join(result['problems'])})" if result['problems'] else ""
+        lines.append(f"{STATUS_ICONS[result['status']]} {result['status']:<7} {ttfb}  "
+                     f"{result['name']}{problems}")
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    ordered = sorted(counts.items(), key=lambda item: STATUS_ORDER[item[0]])
+    summary = ", ".join(f"{count} {status}" for status, count in ordered)
+    lines.append("")
+    lines.append(f"📊 {len(results)} vidéo(s) vérifiée(s): {summary or 'aucune'}")
+    return "\n".join(lines)
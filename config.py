@@ -14,6 +14,15 @@ class Config:
         self.github_token = os.getenv('GITHUB_TOKEN')
         self.github_username = os.getenv('GITHUB_USERNAME')
         self.github_repo = os.getenv('GITHUB_REPO', 'video-assets')
+        self.github_api_url = os.getenv('GITHUB_API_URL',
+                                        'https://api.github.com').rstrip('/')
+        self.github_raw_url = os.getenv('GITHUB_RAW_URL',
+                                        'https://raw.githubusercontent.com').rstrip('/')
+        self.video_layout = os.getenv('VIDEO_LAYOUT', DEFAULT_CONFIG['video_layout'])
+        self.jsdelivr_base_url = os.getenv(
+            'JSDELIVR_BASE_URL', DEFAULT_CONFIG['jsdelivr_base_url']).rstrip('/')
+        self.jsdelivr_stats_url = os.getenv(
+            'JSDELIVR_STATS_URL', DEFAULT_CONFIG['jsdelivr_stats_url']).rstrip('/')
         
         # Validation des paramètres requis
         self.validate_config()
@@ -43,8 +52,15 @@ class Config:
 # Configuration par défaut
 DEFAULT_CONFIG = {
     'max_file_size_mb': 50,
+    'max_optimize_input_mb': 200,
     'supported_formats': ['.mp4', '.webm', '.mov', '.avi', '.mkv'],
     'github_branch': 'main',
     'video_folder': 'videos',
-    'jsdelivr_base_url': 'https://cdn.jsdelivr.net/gh'
+    'video_layout': 'flat',
+    'poster_folder': 'posters',
+    'gallery_page_size': 60,
+    'preview_cache_mb': 500,
+    'stats_cache_hours': 6,
+    'jsdelivr_base_url': 'https://cdn.jsdelivr.net/gh',
+    'jsdelivr_stats_url': 'https://data.jsdelivr.com/v1'
 } 
\ No newline at end of file
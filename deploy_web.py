@@ -5,16 +5,136 @@ Déploie automatiquement sur GitHub Pages
 """
 
 import os
+import re
 import sys
 import json
+import html
+import hashlib
 import subprocess
 from pathlib import Path
-from config import Config
+from urllib.parse import urlparse
+from config import Config, DEFAULT_CONFIG
+from catalog import VideoCatalog
+from video_layout import VideoLayout
+
+GALLERY_DIR = Path("docs") / "gallery"
+GALLERY_MANIFEST = ".manifest.json"
+
+GALLERY_CSS = """
+/* Galerie statique générée par deploy_web.py */
+* { margin: 0; padding: 0; box-sizing: border-box; }
+body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    min-height: 100vh;
+    color: #333;
+    padding: 2rem;
+}
+.container { max-width: 1200px; margin: 0 auto; }
+.header { text-align: center; margin-bottom: 2rem; color: white; }
+.header h1 { font-size: 2.5rem; text-shadow: 2px 2px 4px rgba(0,0,0,0.3); }
+.grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(280px, 1fr));
+    gap: 1.5rem;
+}
+.card {
+    background: rgba(255, 255, 255, 0.95);
+    border-radius: 15px;
+    padding: 1rem;
+    overflow: hidden;
+}
+.preview {
+    display: block;
+    aspect-ratio: 16 / 9;
+    background: #f8f9fa;
+    border-radius: 10px;
+    overflow: hidden;
+    position: relative;
+    color: #667eea;
+    font-size: 3rem;
+    text-align: center;
+    line-height: 0;
+}
+.preview img, .preview video { width: 100%; height: 100%; object-fit: cover; }
+.preview span {
+    position: absolute;
+    inset: 0;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+}
+.name { font-weight: 600; margin: 0.75rem 0 0.25rem; word-break: break-word; }
+.details { font-size: 0.85rem; color: #666; }
+.url {
+    display: block;
+    margin-top: 0.5rem;
+    font-family: monospace;
+    font-size: 0.75rem;
+    word-break: break-all;
+    color: #667eea;
+}
+.pager { display: flex; justify-content: space-between; margin: 2rem 0; }
+.pager a {
+    padding: 10px 20px;
+    border-radius: 50px;
+    background: white;
+    color: #667eea;
+    text-decoration: none;
+    font-weight: 600;
+}
+@media (max-width: 768px) {
+    body { padding: 1rem; }
+    .header h1 { font-size: 1.8rem; }
+}
+"""
+
+# Remplace l'aperçu par la vidéo au clic, sans rien charger avant
+GALLERY_JS = ("document.addEventListener('click',function(e){"
+              "var a=e.target.closest('a.preview');"
+              "if(!a)return;e.preventDefault();var v=document.createElement('video');"
+              "v.src=a.href;v.controls=v.autoplay=v.muted=v.playsInline=true;"
+              "v.preload='auto';a.replaceWith(v);});")
+
+TIMESTAMP_PATTERN = re.compile(r'_(\d{8}_\d{6})_[0-9a-f]{8}$')
+
+
+def minify_css(css):
+    """Minifie une feuille de style (commentaires et espaces superflus)"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def upload_order(entry):
+    """Clé de tri chronologique basée sur l'horodatage du nom de fichier"""
+    match = TIMESTAMP_PATTERN.search(Path(entry['name']).stem)
+    return (match.group(1) if match else '', entry['name'])
+
+
+def write_if_changed(path, content, manifest):
+    """Écrit un fichier seulement si son hash a changé
+
+    Retourne True si le fichier a été (ré)écrit.
+    """
+    path = Path(path)
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    key = path.as_posix()
+    if manifest.get(key) == digest and path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    manifest[key] = digest
+    return True
 
 class WebDeployer:
     def __init__(self):
         try:
             self.config = Config()
+            self.layout = VideoLayout(self.config.video_layout)
         except Exception as e:
             print(f"❌ Erreur de configuration: {e}")
             print("Exécutez 'python setup.py' d'abord")
@@ -227,6 +347,9 @@ make manage
                 <a href="https://github.com/{self.config.github_username}/{self.config.github_repo}/tree/main/videos" class="btn btn-primary" target="_blank">
                     📁 Dossier videos
                 </a>
+                <a href="gallery/" class="btn btn-primary">
+                    🎬 Galerie
+                </a>
             </div>
         </div>
 
@@ -249,6 +372,165 @@ make manage
         print(f"✅ Interface statique créée: {index_path}")
         return index_path
 
+    def load_manifest(self, output_dir):
+        """Charge le manifeste des hashes de pages déjà générées"""
+        manifest_path = Path(output_dir) / GALLERY_MANIFEST
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save_manifest(self, output_dir, manifest):
+        """Sauvegarde le manifeste des hashes de pages"""
+        manifest_path = Path(output_dir) / GALLERY_MANIFEST
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    def sync_catalog(self, catalog):
+        """Met à jour le catalogue depuis GitHub et épingle les nouvelles vidéos
+
+        Chaque vidéo est épinglée sur le commit courant la première fois
+        qu'elle est vue : les URLs restent stables d'un déploiement à l'autre
+        tant que la vidéo ne change pas.
+        """
+        from manage_videos import VideoManager
+        manager = VideoManager()
+
+        videos = manager.fetch_videos()
+        posters = manager.fetch_folder(DEFAULT_CONFIG['poster_folder']) or []
+        head = manager.get_branch_sha(DEFAULT_CONFIG['github_branch'])
+
+        posters_by_stem = {Path(p['name']).stem: p for p in posters}
+        with catalog.edit():
+            catalog.sync(videos)
+            for entry in catalog.videos():
+                entry.setdefault('pinned_ref', head)
+                poster = posters_by_stem.get(Path(entry['name']).stem)
+                if poster is None:
+                    entry.pop('poster', None)
+                elif entry.get('poster', {}).get('sha') != poster['sha']:
+                    entry['poster'] = {'name': poster['name'], 'sha': poster['sha'],
+                                       'ref': head}
+        return catalog.videos()
+
+    def pinned_url(self, path, ref):
+        """URL jsDelivr épinglée sur un commit précis (JSDELIVR_BASE_URL)"""
+        return (f"{self.config.jsdelivr_base_url}/{self.config.github_username}/"
+                f"{self.config.github_repo}@{ref}/{path}")
+
+    def cdn_origin(self):
+        """Origine du CDN configuré, pour le preconnect"""
+        url = urlparse(self.config.jsdelivr_base_url)
+        return f"{url.scheme}://{url.netloc}"
+
+    def render_card(self, entry):
+        """Rend la carte HTML d'une vidéo"""
+        name = html.escape(entry['name'])
+        path = entry.get('path') or self.layout.path(entry['name'])
+        url = html.escape(self.pinned_url(path, entry['pinned_ref']))
+        poster = entry.get('poster')
+        if poster:
+            poster_path = f"{DEFAULT_CONFIG['poster_folder']}/{poster['name']}"
+            poster_url = html.escape(self.pinned_url(poster_path, poster['ref']))
+            preview = (f'<img src="{poster_url}" alt="{name}" loading="lazy" '
+                       f'decoding="async" width="320" height="180">')
+        else:
+            preview = '<span>▶️</span>'
+        size_mb = entry['size'] / (1024 * 1024)
+        details = [f'📏 {size_mb:.1f} MB']
+        if entry.get('width') and entry.get('height'):
+            details.append(f'🖥️ {entry["width"]}x{entry["height"]}')
+        if entry.get('duration'):
+            details.append(f'⏱️ {entry["duration"]:.1f}s')
+        if entry.get('bitrate'):
+            details.append(f'📶 {entry["bitrate"] / 1000:.0f} kbit/s')
+        details.append(f'🔑 {entry["sha"][:8]}')
+        return (f'<div class="card"><a class="preview" href="{url}">{preview}</a>'
+                f'<div class="name">📹 {name}</div>'
+                f'<div class="details">{" • ".join(details)}</div>'
+                f'<a class="url" href="{url}">{url}</a></div>')
+
+    def render_gallery_page(self, entries, page, page_count, css):
+        """Rend une page de la galerie (les plus récentes en premier)"""
+        cards = "\n".join(self.render_card(entry) for entry in reversed(entries))
+        newer = '<span></span>'
+        if page < page_count:
+            newer = f'<a href="page-{page + 1}.html">← Plus récentes</a>'
+        older = '<span></span>'
+        if page > 1:
+            older = f'<a href="page-{page - 1}.html">Plus anciennes →</a>'
+        repo = html.escape(f"{self.config.github_username}/{self.config.github_repo}")
+        origin = html.escape(self.cdn_origin())
+        return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>🎬 Galerie {repo} - page {page}</title>
+<link rel="preconnect" href="{origin}" crossorigin>
+<style>{css}</style>
+</head>
+<body>
+<div class="container">
+<div class="header"><h1>🎬 Galerie vidéos</h1><p>{repo} • page {page}</p></div>
+<div class="grid">
+{cards}
+</div>
+<div class="pager">{newer}{older}</div>
+</div>
+<script>{GALLERY_JS}</script>
+</body>
+</html>
+"""
+
+    def create_static_gallery(self, entries=None, output_dir=GALLERY_DIR):
+        """Génère la galerie statique paginée de manière incrémentale
+
+        Les pages sont découpées dans l'ordre chronologique des uploads : un
+        nouvel upload ne modifie que la dernière page (et l'index). Seules les
+        pages dont le hash a changé sont réécrites.
+        """
+        print("🎬 Génération de la galerie statique...")
+        output_dir = Path(output_dir)
+
+        if entries is None:
+            entries = self.sync_catalog(VideoCatalog())
+        entries = sorted(entries, key=upload_order)
+
+        page_size = DEFAULT_CONFIG['gallery_page_size']
+        pages = [entries[i:i + page_size]
+                 for i in range(0, len(entries), page_size)] or [[]]
+        page_count = len(pages)
+        css = minify_css(GALLERY_CSS)
+
+        manifest = self.load_manifest(output_dir)
+        expected = set()
+        written = 0
+        for page, page_entries in enumerate(pages, 1):
+            content = self.render_gallery_page(page_entries, page, page_count, css)
+            paths = [output_dir / f"page-{page}.html"]
+            if page == page_count:
+                paths.append(output_dir / "index.html")
+            for path in paths:
+                expected.add(path.as_posix())
+                written += write_if_changed(path, content, manifest)
+
+        # Supprimer les pages qui n'existent plus
+        removed = 0
+        for key in list(manifest):
+            if key not in expected:
+                if Path(key).exists():
+                    os.remove(key)
+                del manifest[key]
+                removed += 1
+
+        self.save_manifest(output_dir, manifest)
+        print(f"✅ Galerie: {len(entries)} vidéo(s), {page_count} page(s), "
+              f"{written} réécrite(s), {len(expected) - written} inchangée(s), "
+              f"{removed} supprimée(s)")
+        return written
+
     def setup_github_pages(self):
         """Configure GitHub Pages"""
         print("⚙️ Configuration de GitHub Pages...")
@@ -307,6 +589,12 @@ plugins:
         # Créer l'interface statique
         self.create_static_html()
         
+        # Générer la galerie
+        try:
+            self.create_static_gallery()
+        except Exception as e:
+            print(f"⚠️ Galerie non générée: {e}")
+
         # Créer la config Jekyll
         self.create_github_pages_config()
         
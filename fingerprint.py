@@ -0,0 +1,220 @@
+"""
+Empreintes perceptuelles de vidéos pour détecter les quasi-doublons
+Échantillonne des images à intervalle fixe (via ffmpeg) et calcule un dHash 64 bits
+"""
+
+import os
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from catalog import file_lock, write_json_atomic
+
+DEFAULT_INDEX_PATH = os.getenv('FINGERPRINT_INDEX', 'fingerprints.json')
+
+# Une image par seconde, réduite en 9x8 niveaux de gris pour le dHash
+SAMPLE_INTERVAL = 1.0
+HASH_WIDTH, HASH_HEIGHT = 9, 8
+FRAME_BYTES = HASH_WIDTH * HASH_HEIGHT
+
+# Distance de Hamming moyenne (sur 64 bits) en dessous de laquelle deux
+# vidéos sont considérées comme des quasi-doublons
+DEFAULT_THRESHOLD = 8
+
+# Décalage max (en images) testé pour aligner deux vidéos rognées
+MAX_SHIFT = 5
+
+# Part minimale de la vidéo la plus courte devant se recouvrir
+MIN_OVERLAP = 0.8
+
+# Découpage des hashes en 4 bandes de 16 bits pour la recherche de candidats
+# (multi-index) : deux images à 3 bits d'écart ou moins partagent forcément une bande
+BANDS = 4
+BAND_BITS = 64 // BANDS
+
+# Part minimale des images (de la vidéo la plus courte) qui doivent partager une bande
+# avec une vidéo pour qu'elle soit comparée en entier
+MIN_CANDIDATE_FRAMES = 0.25
+
+
+def ffmpeg_binary():
+    """Chemin de ffmpeg (FFMPEG_BINARY ou PATH)"""
+    binary = os.getenv('FFMPEG_BINARY') or shutil.which('ffmpeg')
+    if not binary:
+        raise RuntimeError("ffmpeg introuvable "
+                           "(installer ffmpeg ou définir FFMPEG_BINARY)")
+    return binary
+
+
+def dhash(pixels):
+    """dHash 64 bits d'une image 9x8 en niveaux de gris"""
+    value = 0
+    for row in range(HASH_HEIGHT):
+        offset = row * HASH_WIDTH
+        for col in range(HASH_WIDTH - 1):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def extract_frame_hashes(source, interval=SAMPLE_INTERVAL):
+    """Hashes des images échantillonnées d'une vidéo (fichier ou URL)"""
+    command = [
+        ffmpeg_binary(), '-v', 'error', '-i', str(source), '-an', '-sn',
+        '-vf', (f'fps=1/{interval},scale={HASH_WIDTH}:{HASH_HEIGHT}'
+                ':flags=area,format=gray'),
+        '-f', 'rawvideo', '-',
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', 'replace').strip()
+        raise RuntimeError(f"ffmpeg: {error[:200]}")
+    data = result.stdout
+    return [dhash(data[i:i + FRAME_BYTES])
+            for i in range(0, len(data) - FRAME_BYTES + 1, FRAME_BYTES)]
+
+
+def sequence_distance(a, b, max_shift=MAX_SHIFT):
+    """Meilleure distance moyenne entre deux séquences de hashes
+
+    Teste les décalages de -max_shift à +max_shift pour tolérer un rognage
+    en début de vidéo. Retourne (distance moyenne, taux de recouvrement).
+    """
+    if not a or not b:
+        return None, 0.0
+    best = (None, 0.0)
+    shorter = min(len(a), len(b))
+    for shift in range(-max_shift, max_shift + 1):
+        pairs = [(a[i], b[i + shift]) for i in range(len(a)) if 0 <= i + shift < len(b)]
+        if not pairs:
+            continue
+        overlap = len(pairs) / shorter
+        if overlap < MIN_OVERLAP:
+            continue
+        distance = sum(hamming(x, y) for x, y in pairs) / len(pairs)
+        if best[0] is None or distance < best[0]:
+            best = (distance, overlap)
+    return best
+
+
+def bands(value):
+    """Bandes d'un hash (clés de la recherche de candidats)"""
+    mask = (1 << BAND_BITS) - 1
+    return [(band, (value >> (band * BAND_BITS)) & mask) for band in range(BANDS)]
+
+
+class FingerprintIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.entries = {}
+        self.buckets = {}
+        self.load()
+
+    def load(self):
+        """Charge l'index depuis le disque"""
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = {name: [int(h, 16) for h in hashes]
+                            for name, hashes in data.get('videos', {}).items()}
+        self.rebuild_buckets()
+        return self.entries
+
+    def save(self):
+        """Sauvegarde l'index de manière atomique"""
+        data = {
+            'interval': SAMPLE_INTERVAL,
+            'videos': {name: [f'{h:016x}' for h in hashes]
+                       for name, hashes in sorted(self.entries.items())},
+        }
+        write_json_atomic(self.path, data, indent=1)
+
+    @contextmanager
+    def edit(self):
+        """Recharge, laisse modifier puis sauvegarde l'index sous verrou"""
+        with file_lock(self.path):
+            self.load()
+            yield self
+            self.save()
+
+    def rebuild_buckets(self):
+        self.buckets = {}
+        for name, hashes in self.entries.items():
+            self._index(name, hashes)
+
+    def _index(self, name, hashes):
+        for value in hashes:
+            for key in bands(value):
+                self.buckets.setdefault(key, set()).add(name)
+
+    def add(self, name, hashes):
+        """Ajoute (ou remplace) l'empreinte d'une vidéo"""
+        if name in self.entries:
+            self.remove(name)
+        self.entries[name] = list(hashes)
+        self._index(name, self.entries[name])
+
+    def remove(self, name):
+        """Retire une vidéo de l'index (seulement de ses propres seaux)"""
+        for value in self.entries.pop(name, []):
+            for key in bands(value):
+                bucket = self.buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(name)
+                    if not bucket:
+                        del self.buckets[key]
+
+    def candidates(self, hashes):
+        """Vidéos dont assez d'images partagent une bande exacte avec la séquence
+
+        Un quasi-doublon (réencodage, redimensionnement) a la plupart de ses
+        images à quelques bits d'écart : elles tombent dans les mêmes seaux.
+        Une vidéo qui ne partage que quelques images (noir, fondu) n'est pas
+        comparée en entier.
+        """
+        matches = {}
+        for value in hashes:
+            found = set()
+            for key in bands(value):
+                found |= self.buckets.get(key, set())
+            for name in found:
+                matches[name] = matches.get(name, 0) + 1
+        return {name for name, count in matches.items()
+                if count >= max(1, MIN_CANDIDATE_FRAMES
+                                * min(len(hashes), len(self.entries[name])))}
+
+    def find_similar(self, hashes, threshold=DEFAULT_THRESHOLD, exclude=None):
+        """Quasi-doublons d'une séquence, triés par distance croissante"""
+        matches = []
+        for name in self.candidates(hashes):
+            if name == exclude:
+                continue
+            distance, overlap = sequence_distance(hashes, self.entries[name])
+            if distance is not None and distance <= threshold:
+                matches.append({'name': name, 'distance': round(distance, 2),
+                                'overlap': round(overlap, 2)})
+        return sorted(matches, key=lambda m: m['distance'])
+
+    def clusters(self, threshold=DEFAULT_THRESHOLD):
+        """Groupes de quasi-doublons de toute la bibliothèque (union-find)"""
+        parent = {name: name for name in self.entries}
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for name, hashes in self.entries.items():
+            for match in self.find_similar(hashes, threshold, exclude=name):
+                parent[find(match['name'])] = find(name)
+
+        groups = {}
+        for name in self.entries:
+            groups.setdefault(find(name), []).append(name)
+        return sorted((sorted(group) for group in groups.values() if len(group) > 1),
+                      key=lambda g: (-len(g), g))
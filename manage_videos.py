@@ -4,10 +4,25 @@ Gestionnaire de vidéos GitHub + jsDelivr
 Liste, supprime et gère les vidéos uploadées
 """
 
+import re
 import sys
+import json
+import time
+import asyncio
+import argparse
 import requests
-from datetime import datetime
-from config import Config
+from urllib.parse import urlparse
+from datetime import datetime, timezone
+from config import Config, DEFAULT_CONFIG
+from snippet_generator import SnippetGenerator, save_snippets
+from catalog import VideoCatalog
+from fingerprint import DEFAULT_THRESHOLD, FingerprintIndex, extract_frame_hashes
+from cdn_verify import SORT_KEYS, format_report, sort_results, verify_videos
+from video_layout import LAYOUTS, VideoLayout, resolve_redirect
+from upload_video import commit_tree
+from batch_journal import DEFAULT_DELETE_JOURNAL, DELETE_STEPS, BatchJournal
+import mirror_pull
+import cdn_stats
 import pyperclip
 
 class VideoManager:
@@ -18,26 +33,92 @@ class VideoManager:
             'Authorization': f'token {self.config.github_token}',
             'User-Agent': 'GitHub-jsDelivr-Video-Manager'
         })
+        self.layout = VideoLayout(self.config.video_layout)
+        # Chemins réels des vidéos lors du dernier listing (nom → chemin)
+        self.paths = {}
+
+    def fetch_folder(self, folder='videos'):
+        """Récupère le contenu brut d'un dossier du repository (sans affichage)
+
+        Retourne None si le dossier n'existe pas, lève une RuntimeError en cas
+        d'erreur API.
+        """
+        response = self.session.get(self.api_url(f"contents/{folder}"))
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"Erreur API: {response.status_code}")
+        return [item for item in response.json() if item.get('type', 'file') == 'file']
+
+    def get_branch_sha(self, branch='main'):
+        """Retourne le SHA du dernier commit de la branche"""
+        response = self.session.get(self.api_url(f"commits/{branch}"),
+                                    headers={'Accept': 'application/vnd.github.sha'})
+        if response.status_code != 200:
+            raise RuntimeError(f"Impossible de lire la branche {branch}: "
+                               f"{response.status_code}")
+        return response.text.strip()
+
+    def fetch_videos(self, branch='main'):
+        """Récupère toutes les vidéos du repository (sans affichage)
+
+        Utilise l'API Git Trees en récursif : couvre les sous-dossiers de
+        l'organisation répartie et n'a pas la limite de 1000 entrées de l'API
+        Contents. Chaque entrée a les clés name, path, size et sha.
+        """
+        response = self.session.get(self.api_url(f"git/trees/{branch}"),
+                                    params={'recursive': 1})
+        if response.status_code in (404, 409):
+            # Branche absente ou repository vide
+            return []
+        if response.status_code != 200:
+            raise RuntimeError(f"Erreur API: {response.status_code}")
+        tree = response.json()
+        if tree.get('truncated'):
+            print("⚠️ Listing de l'arbre tronqué par l'API, "
+                  "certaines vidéos peuvent manquer", file=sys.stderr)
+        videos = [
+            {'name': item['path'].rsplit('/', 1)[-1], 'path': item['path'],
+             'size': item.get('size', 0), 'sha': item['sha'], 'type': 'file'}
+            for item in tree['tree']
+            if item['type'] == 'blob' and self.layout.is_video_path(item['path'])
+        ]
+        self.paths = {video['name']: video['path'] for video in videos}
+        return sorted(videos, key=lambda video: video['name'])
+
+    def video_url(self, filename, base_url=None, path=None):
+        """URL jsDelivr d'une vidéo
+
+        Utilise le chemin réel (argument ou dernier listing) : une vidéo restée
+        à un ancien emplacement, ou un repository mêlant les organisations,
+        garde une URL correcte. Sinon, chemin de l'organisation configurée.
+        """
+        path = path or self.paths.get(filename) or self.layout.path(filename)
+        base_url = (base_url or self.config.jsdelivr_base_url).rstrip('/')
+        return (f"{base_url}/{self.config.github_username}/{self.config.github_repo}"
+                f"@{DEFAULT_CONFIG['github_branch']}/{path}")
+
+    def locate(self, filename):
+        """Chemin réel d'une vidéo : celui du résolveur, sinon celui du listing
+
+        Permet de gérer une vidéo restée à un ancien emplacement (avant migration).
+        """
+        path = self.layout.path(filename)
+        response = self.session.get(self.api_url(f"contents/{path}"))
+        if response.status_code == 200:
+            return path, response.json()['sha']
+        for video in self.fetch_videos():
+            if video['name'] == filename:
+                return video['path'], video['sha']
+        return None, None
 
     def list_videos(self):
         """Liste toutes les vidéos uploadées"""
         print("📋 Liste des vidéos uploadées")
         print("=" * 50)
         
-        url = f"https://api.github.com/repos/{self.config.github_username}/{self.config.github_repo}/contents/videos"
-        
         try:
-            response = self.session.get(url)
-            if response.status_code == 404:
-                print("📁 Aucune vidéo trouvée (dossier videos/ vide)")
-                return []
-            
-            if response.status_code != 200:
-                print(f"❌ Erreur API: {response.status_code}")
-                return []
-            
-            videos = response.json()
-            
+            videos = self.fetch_videos()
             if not videos:
                 print("📁 Aucune vidéo trouvée")
                 return []
@@ -47,7 +128,7 @@ class VideoManager:
             for i, video in enumerate(videos, 1):
                 name = video['name']
                 size_mb = video['size'] / (1024 * 1024)
-                jsdelivr_url = f"https://cdn.jsdelivr.net/gh/{self.config.github_username}/{self.config.github_repo}@main/videos/{name}"
+                jsdelivr_url = self.video_url(name, path=video['path'])
                 
                 print(f"{i}. 📹 {name}")
                 print(f"   📏 Taille: {size_mb:.1f} MB")
@@ -65,17 +146,13 @@ class VideoManager:
         """Supprime une vidéo"""
         print(f"🗑️ Suppression de {filename}...")
         
-        # Récupérer le SHA du fichier
-        url = f"https://api.github.com/repos/{self.config.github_username}/{self.config.github_repo}/contents/videos/{filename}"
-        
         try:
-            response = self.session.get(url)
-            if response.status_code != 200:
+            # Récupérer le chemin et le SHA du fichier
+            path, sha = self.locate(filename)
+            if path is None:
                 print(f"❌ Fichier {filename} non trouvé")
                 return False
-            
-            file_info = response.json()
-            sha = file_info['sha']
+            url = self.api_url(f"contents/{path}")
             
             # Supprimer le fichier
             delete_data = {
@@ -88,6 +165,9 @@ class VideoManager:
             
             if delete_response.status_code == 200:
                 print(f"✅ {filename} supprimé avec succès!")
+                index = FingerprintIndex()
+                with index.edit():
+                    index.remove(filename)
                 return True
             else:
                 print(f"❌ Erreur lors de la suppression: {delete_response.status_code}")
@@ -97,13 +177,506 @@ class VideoManager:
             print(f"❌ Erreur: {e}")
             return False
 
+    def delete_many(self, filenames, journal_path=None):
+        """Supprime plusieurs vidéos en un seul commit (API Git Data)
+
+        Les suppressions sont annoncées dans le journal avant le commit :
+        relancer la même commande après une interruption ignore les vidéos
+        déjà supprimées. Sans `journal_path`, le journal par défaut est vidé
+        du lot une fois celui-ci terminé sans erreur. Retourne le journal.
+        """
+        journal = BatchJournal(journal_path or DEFAULT_DELETE_JOURNAL,
+                               steps=DELETE_STEPS)
+        print(f"🗑️ Suppression de {len(filenames)} vidéo(s) (journal: {journal.path})")
+        try:
+            paths = {video['name']: video['path'] for video in self.fetch_videos()}
+        except Exception as e:
+            print(f"❌ Erreur: {e}")
+            for filename in filenames:
+                if journal.step(filename, 'deleted') is None:
+                    journal.fail(filename, e)
+            return journal
+
+        pending = []
+        for filename in filenames:
+            if journal.step(filename, 'deleted') is not None:
+                journal.batch_keys.add(filename)
+                print(f"⏭️ {filename}: déjà supprimé")
+            elif filename not in paths:
+                # Supprimée juste avant l'interruption (ou jamais uploadée)
+                print(f"⏭️ {filename}: absente du repository")
+                journal.record(filename, 'deleted', absent=True)
+            else:
+                pending.append(filename)
+
+        if pending:
+            for filename in pending:
+                journal.begin(filename, 'deleted', path=paths[filename])
+            message = f"Delete {len(pending)} videos"
+            if len(pending) <= 5:
+                message += ": " + ", ".join(pending)
+            tree_entries = [{'path': paths[filename], 'mode': '100644', 'type': 'blob',
+                             'sha': None}
+                            for filename in pending]
+            try:
+                commit_sha = commit_tree(self.session, self.config, tree_entries,
+                                         message, DEFAULT_CONFIG['github_branch'])
+            except Exception as e:
+                print(f"❌ Erreur lors du commit: {e}")
+                for filename in pending:
+                    journal.fail(filename, e)
+            else:
+                for filename in pending:
+                    journal.record(filename, 'deleted', commit=commit_sha)
+                index = FingerprintIndex()
+                with index.edit():
+                    for filename in pending:
+                        index.remove(filename)
+                print(f"✅ Commit {commit_sha[:8]}: "
+                      f"{len(pending)} vidéo(s) supprimée(s)")
+        print("\n" + journal.format_report(journal.batch_keys))
+        if journal_path is None and not journal.summary(journal.batch_keys)['failed']:
+            journal.forget(journal.batch_keys)
+        return journal
+
     def get_video_url(self, filename):
         """Génère et copie l'URL jsDelivr d'une vidéo"""
-        jsdelivr_url = f"https://cdn.jsdelivr.net/gh/{self.config.github_username}/{self.config.github_repo}@main/videos/{filename}"
+        jsdelivr_url = self.video_url(filename)
         pyperclip.copy(jsdelivr_url)
         print(f"🔗 URL copiée: {jsdelivr_url}")
         return jsdelivr_url
 
+    def generate_snippets(self, filename):
+        """Génère les snippets d'une vidéo avec ses variantes et son poster"""
+        print(f"🧩 Génération des snippets pour {filename}...")
+        try:
+            videos = self.fetch_videos()
+            posters = self.fetch_folder(DEFAULT_CONFIG['poster_folder']) or []
+        except Exception as e:
+            print(f"❌ Erreur: {e}")
+            return []
+
+        generator = SnippetGenerator(self.config.github_username,
+                                     self.config.github_repo, layout=self.layout,
+                                     base_url=self.config.jsdelivr_base_url)
+        if filename not in {video['name'] for video in videos}:
+            print(f"⚠️ {filename} absent du repository, snippet généré sans variantes")
+        metadata = VideoCatalog().entries
+        snippets = generator.generate(filename, videos, posters, metadata)
+        paths = save_snippets(filename, snippets)
+        for path in paths:
+            print(f"📄 Snippet sauvé: {path}")
+        return paths
+
+    def verify_videos(self, base_url=None, concurrency=8, slow_threshold=1.0,
+                      sort_by='status', as_json=False):
+        """Vérifie que chaque URL jsDelivr sert les octets attendus"""
+        base_url = (base_url or self.config.jsdelivr_base_url).rstrip('/')
+        # En JSON, stdout ne contient que le rapport
+        out = sys.stderr if as_json else sys.stdout
+        print(f"🩺 Vérification des URLs ({base_url})...", file=out)
+
+        try:
+            videos = self.fetch_videos()
+        except Exception as e:
+            print(f"❌ Erreur: {e}", file=out)
+            return None
+
+        results = asyncio.run(verify_videos(videos,
+                                            lambda name: self.video_url(name, base_url),
+                                            concurrency, slow_threshold))
+        results = sort_results(results, sort_by)
+        if as_json:
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            print(format_report(results))
+        return results
+
+    def dedupe_report(self, threshold=DEFAULT_THRESHOLD):
+        """Liste les groupes de quasi-doublons de la bibliothèque
+
+        Les vidéos absentes de l'index d'empreintes sont analysées directement
+        depuis leur URL jsDelivr, puis ajoutées à l'index.
+        """
+        print("♊ Recherche de quasi-doublons")
+        print("=" * 50)
+
+        # Noms indexés avant le listing : une vidéo uploadée entre-temps
+        # n'est pas élaguée
+        known = set(FingerprintIndex().entries)
+        try:
+            videos = self.fetch_videos()
+        except Exception as e:
+            print(f"❌ Erreur: {e}")
+            return []
+
+        # Empreintes calculées hors verrou (téléchargement), appliquées en une édition
+        names = {video['name'] for video in videos}
+        missing = [video['name'] for video in videos if video['name'] not in known]
+        computed = {}
+        for i, name in enumerate(missing, 1):
+            url = self.video_url(name)
+            print(f"🔎 Empreinte {i}/{len(missing)}: {name}")
+            try:
+                computed[name] = extract_frame_hashes(url)
+            except RuntimeError as e:
+                print(f"⚠️ {name}: {e}")
+
+        index = FingerprintIndex()
+        with index.edit():
+            for name in known - names:
+                index.remove(name)
+            for name, hashes in computed.items():
+                index.add(name, hashes)
+
+        sizes = {video['name']: video['size'] for video in videos}
+        clusters = index.clusters(threshold)
+        total_savings = 0
+        for i, cluster in enumerate(clusters, 1):
+            # On garde la plus grande version de chaque groupe
+            cluster_sizes = [sizes.get(name, 0) for name in cluster]
+            savings = sum(cluster_sizes) - max(cluster_sizes)
+            total_savings += savings
+            print(f"\n{i}. {len(cluster)} vidéos, "
+                  f"{savings / (1024 * 1024):.1f} MB récupérables")
+            for name in cluster:
+                print(f"   📹 {name} ({sizes.get(name, 0) / (1024 * 1024):.1f} MB)")
+
+        if clusters:
+            print(f"\n📊 {len(clusters)} groupe(s), "
+                  f"{total_savings / (1024 * 1024):.1f} MB récupérables au total")
+        else:
+            print("✅ Aucun quasi-doublon trouvé")
+        return clusters
+
+    def api_url(self, path):
+        """URL de l'API GitHub pour le repository configuré"""
+        return (f"{self.config.github_api_url}/repos/{self.config.github_username}/"
+                f"{self.config.github_repo}/{path}")
+
+    def estimate_compaction(self, branch='main'):
+        """Estime le gain d'une compaction (taille du repo vs arbre courant)"""
+        response = self.session.get(self.api_url(f"git/ref/heads/{branch}"))
+        if response.status_code != 200:
+            raise RuntimeError(f"Branche {branch} introuvable: {response.status_code}")
+        head_sha = response.json()['object']['sha']
+
+        response = self.session.get(self.api_url(f"git/commits/{head_sha}"))
+        response.raise_for_status()
+        head_commit = response.json()
+        tree_sha = head_commit['tree']['sha']
+
+        response = self.session.get(self.api_url(f"git/trees/{tree_sha}"),
+                                    params={'recursive': 1})
+        response.raise_for_status()
+        tree = response.json()
+        blobs = [item for item in tree['tree'] if item['type'] == 'blob']
+        live_size = sum(item.get('size', 0) for item in blobs)
+
+        response = self.session.get(f"{self.config.github_api_url}/repos/"
+                                    f"{self.config.github_username}/"
+                                    f"{self.config.github_repo}")
+        response.raise_for_status()
+        repo_size = response.json()['size'] * 1024
+
+        return {
+            'branch': branch,
+            'head_sha': head_sha,
+            'tree_sha': tree_sha,
+            'has_parents': bool(head_commit.get('parents')),
+            'files': len(blobs),
+            'live_size': live_size,
+            'repo_size': repo_size,
+            'reclaimable': max(repo_size - live_size, 0),
+            'truncated': tree.get('truncated', False),
+        }
+
+    def compact_repository(self, dry_run=True, backup=True, branch='main'):
+        """Remplace l'historique par un commit sans parent de l'arbre courant
+
+        Les anciens blobs (vidéos remplacées ou supprimées) ne sont plus
+        référencés par la branche. Avec backup, l'ancien commit reste accessible
+        via refs/heads/backup/compact-<date> (et ses blobs restent stockés).
+        """
+        print("🗜️ Compaction de l'historique du repository")
+        print("=" * 50)
+
+        try:
+            estimate = self.estimate_compaction(branch)
+        except Exception as e:
+            print(f"❌ Erreur: {e}")
+            return None
+
+        live_mb = estimate['live_size'] / (1024 * 1024)
+        print(f"📁 Fichiers vivants: {estimate['files']} ({live_mb:.1f} MB)")
+        print(f"📦 Taille du repository: {estimate['repo_size'] / (1024 * 1024):.1f} MB")
+        print(f"♻️ Gain estimé: {estimate['reclaimable'] / (1024 * 1024):.1f} MB")
+        if estimate['truncated']:
+            print("⚠️ Listing de l'arbre tronqué par l'API, estimation approximative")
+        if not estimate['has_parents']:
+            print("✅ Historique déjà compact (commit sans parent)")
+            return estimate
+
+        if dry_run:
+            print("\n🔍 Simulation uniquement. Relancer avec --yes pour compacter.")
+            return estimate
+
+        try:
+            if backup:
+                stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+                backup_ref = f"refs/heads/backup/compact-{stamp}"
+                response = self.session.post(self.api_url("git/refs"), json={
+                    'ref': backup_ref,
+                    'sha': estimate['head_sha'],
+                })
+                if response.status_code != 201:
+                    raise RuntimeError("Création de la sauvegarde impossible: "
+                                       f"{response.status_code}")
+                estimate['backup_ref'] = backup_ref
+                print(f"💾 Sauvegarde: {backup_ref}")
+
+            response = self.session.post(self.api_url("git/commits"), json={
+                'message': f"Compact history ({estimate['files']} live files)",
+                'tree': estimate['tree_sha'],
+                'parents': [],
+            })
+            if response.status_code != 201:
+                raise RuntimeError("Création du commit impossible: "
+                                   f"{response.status_code}")
+            new_sha = response.json()['sha']
+
+            # Ne pas écraser un commit arrivé entre-temps (la mise à jour est forcée)
+            response = self.session.get(self.api_url(f"git/ref/heads/{branch}"))
+            if (response.status_code != 200
+                    or response.json()['object']['sha'] != estimate['head_sha']):
+                raise RuntimeError(f"{branch} a changé pendant la compaction, "
+                                   "relancer la commande")
+
+            response = self.session.patch(self.api_url(f"git/refs/heads/{branch}"),
+                                          json={'sha': new_sha, 'force': True})
+            if response.status_code != 200:
+                raise RuntimeError(f"Mise à jour de {branch} impossible: "
+                                   f"{response.status_code}")
+        except Exception as e:
+            print(f"❌ Erreur: {e}")
+            return None
+
+        # Les URLs épinglées sur les anciens commits ne sont plus valides
+        catalog = VideoCatalog()
+        with catalog.edit():
+            for entry in catalog.entries.values():
+                entry.pop('pinned_ref', None)
+                entry.pop('poster', None)
+
+        estimate['new_sha'] = new_sha
+        print(f"✅ {branch} déplacée sur {new_sha[:8]} (commit sans parent)")
+        if backup:
+            print("ℹ️ Supprimer la branche de sauvegarde "
+                  "pour libérer réellement l'espace")
+        print("⏰ GitHub libère l'espace lors de son prochain garbage collection.")
+        return estimate
+
+    def pull_videos(self, dest_dir='videos_backup', source='raw', base_url=None,
+                    concurrency=4, rate_limit=None, as_json=False):
+        """Télécharge toute la bibliothèque (reprise, vérification SHA, débit limité)
+
+        Les fichiers sont écrits sous dest_dir avec leur chemin dans le
+        repository. `source` vaut 'raw' (raw.githubusercontent.com, authentifié)
+        ou 'jsdelivr' ; base_url remplace l'URL de base de la source.
+        """
+        # En JSON, stdout ne contient que le rapport
+        out = sys.stderr if as_json else sys.stdout
+        print(f"📥 Téléchargement de la bibliothèque vers {dest_dir}/", file=out)
+        print("=" * 50, file=out)
+
+        try:
+            # Listing et téléchargements sur le même commit
+            ref = self.get_branch_sha(DEFAULT_CONFIG['github_branch'])
+            videos = self.fetch_videos(ref)
+        except Exception as e:
+            print(f"❌ Erreur: {e}", file=out)
+            return None
+
+        owner_repo = f"{self.config.github_username}/{self.config.github_repo}"
+        headers = {}
+        if source == 'raw':
+            base_url = (base_url or self.config.github_raw_url).rstrip('/')
+            headers['Authorization'] = f'token {self.config.github_token}'
+
+            def url_for(entry):
+                return f"{base_url}/{owner_repo}/{ref}/{entry['path']}"
+        else:
+            base_url = (base_url or self.config.jsdelivr_base_url).rstrip('/')
+
+            def url_for(entry):
+                return f"{base_url}/{owner_repo}@{ref}/{entry['path']}"
+
+        total = sum(video['size'] for video in videos)
+        print(f"📹 {len(videos)} vidéo(s), {total / (1024 * 1024):.1f} MB "
+              f"depuis {base_url} (commit {ref[:8]})", file=out)
+        start = time.monotonic()
+        results = asyncio.run(mirror_pull.pull_videos(videos, url_for, dest_dir,
+                                                      concurrency, rate_limit, headers))
+        if as_json:
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            print(mirror_pull.format_report(results, time.monotonic() - start))
+        return results
+
+    def stats_report(self, period='month', base_url=None, refresh=False, top=None,
+                     target_bitrate=cdn_stats.DEFAULT_TARGET_BITRATE, as_json=False):
+        """Classe les vidéos par octets servis par jsDelivr et le gain d'un réencodage
+
+        Les statistiques de la branche et des commits épinglés (catalogue)
+        sont additionnées. Les réponses de l'API sont mises en cache
+        `stats_cache_hours` heures ; refresh force une nouvelle requête.
+        """
+        stats_url = (base_url or self.config.jsdelivr_stats_url).rstrip('/')
+        # En JSON, stdout ne contient que le rapport
+        out = sys.stderr if as_json else sys.stdout
+        print(f"📈 Statistiques jsDelivr ({period}, {stats_url})...", file=out)
+
+        catalog = VideoCatalog()
+        branch = DEFAULT_CONFIG['github_branch']
+        refs = [branch] + sorted({entry['pinned_ref']
+                                  for entry in catalog.entries.values()
+                                  if entry.get('pinned_ref')})
+        cache = cdn_stats.StatsCache(ttl=DEFAULT_CONFIG['stats_cache_hours'] * 3600)
+        session = requests.Session()
+        session.headers['User-Agent'] = 'GitHub-jsDelivr-Video-Manager'
+
+        try:
+            videos = self.fetch_videos()
+            redirects = self.fetch_redirects()
+            stats_by_ref = []
+            username, repo = self.config.github_username, self.config.github_repo
+            for ref in refs:
+                key = f"{stats_url}/{username}/{repo}@{ref}?period={period}"
+                cached = None if refresh else cache.get(key)
+                if not cached:
+                    cached = cache.put(key, cdn_stats.fetch_file_stats(
+                        session, stats_url, username, repo, ref, period))
+                stats_by_ref.append(cached['files'])
+            cache.save()
+        except Exception as e:
+            print(f"❌ Erreur: {e}", file=out)
+            return []
+
+        stats = cdn_stats.merge_stats(stats_by_ref, redirects)
+        ranking = cdn_stats.rank_videos(stats, videos, catalog.entries,
+                                        target_bitrate)[:top]
+        if as_json:
+            print(json.dumps(ranking, indent=2, ensure_ascii=False))
+        else:
+            print(cdn_stats.format_report(ranking, period, target_bitrate))
+        return ranking
+
+    def fetch_redirects(self):
+        """Table des redirections (ancien chemin → nouveau chemin) du repository"""
+        url = self.api_url(f"contents/{self.layout.redirects_path}")
+        response = self.session.get(url,
+                                    headers={'Accept': 'application/vnd.github.raw'})
+        if response.status_code == 404:
+            return {}
+        if response.status_code != 200:
+            raise RuntimeError(f"Erreur API: {response.status_code}")
+        return json.loads(response.content).get('redirects', {})
+
+    def migrate_layout(self, target=None, dry_run=True, branch='main'):
+        """Déplace toutes les vidéos vers une organisation en un seul commit
+
+        Les blobs ne sont pas ré-uploadés : le commit référence les mêmes SHA
+        à leurs nouveaux chemins. Les anciens chemins sont ajoutés à
+        videos/_redirects.json pour pouvoir résoudre les anciennes URLs.
+        """
+        layout = VideoLayout(target or self.config.video_layout)
+        print(f"🗂️ Migration vers l'organisation '{layout.kind}'")
+        print("=" * 50)
+
+        try:
+            videos = self.fetch_videos(branch)
+            redirects = self.fetch_redirects()
+        except Exception as e:
+            print(f"❌ Erreur: {e}")
+            return None
+
+        moves = [(video['path'], layout.path(video['name']), video) for video in videos
+                 if video['path'] != layout.path(video['name'])]
+        print(f"📹 {len(videos)} vidéo(s), {len(moves)} à déplacer")
+        for old_path, new_path, _ in moves[:10]:
+            print(f"   {old_path} → {new_path}")
+        if len(moves) > 10:
+            print(f"   ... et {len(moves) - 10} autre(s)")
+
+        if moves and not dry_run:
+            # Les redirections existantes suivent les vidéos déplacées
+            moved = {old_path: new_path for old_path, new_path, _ in moves}
+            redirects = {old: moved.get(new, new) for old, new in redirects.items()}
+            redirects.update(moved)
+            # Un chemin de nouveau occupé ne doit plus être redirigé
+            live = {layout.path(video['name']) for video in videos}
+            redirects = {old: new for old, new in redirects.items()
+                         if old != new and old not in live}
+
+            tree_entries = []
+            for old_path, new_path, video in moves:
+                tree_entries.append({'path': new_path, 'mode': '100644',
+                                     'type': 'blob', 'sha': video['sha']})
+                tree_entries.append({'path': old_path, 'mode': '100644',
+                                     'type': 'blob', 'sha': None})
+            content = json.dumps({'redirects': redirects}, indent=2, sort_keys=True)
+            tree_entries.append({
+                'path': layout.redirects_path, 'mode': '100644', 'type': 'blob',
+                'content': content + "\n",
+            })
+
+            message = f"Migrate videos to {layout.kind} layout ({len(moves)} files)"
+            try:
+                commit_sha = commit_tree(self.session, self.config, tree_entries,
+                                         message, branch)
+            except Exception as e:
+                print(f"❌ Erreur: {e}")
+                return None
+
+            # Les URLs épinglées pointent vers les anciens chemins
+            catalog = VideoCatalog()
+            with catalog.edit():
+                for _, _, video in moves:
+                    entry = catalog.get(video['name'])
+                    if entry:
+                        entry.pop('pinned_ref', None)
+            print(f"✅ Commit {commit_sha[:8]}: {len(moves)} vidéo(s) déplacée(s), "
+                  f"redirections dans {layout.redirects_path}")
+        elif dry_run and moves:
+            print("\n🔍 Simulation uniquement. Relancer avec --yes pour migrer.")
+
+        if layout.kind != self.config.video_layout:
+            print(f"ℹ️ Pensez à définir VIDEO_LAYOUT={layout.kind} dans .env")
+        return moves
+
+    def resolve_url(self, old):
+        """URL jsDelivr actuelle d'une ancienne URL ou d'un ancien chemin
+
+        Accepte les URLs de la forme <base>/user/repo[@ref]/chemin (quelle que
+        soit la base) et les chemins du repository.
+        """
+        path = old
+        repo = f"{self.config.github_username}/{self.config.github_repo}"
+        if '://' in old:
+            owner_repo = (f"/{re.escape(self.config.github_username)}"
+                          f"/{re.escape(self.config.github_repo)}")
+            match = re.search(owner_repo + r'(?:@[^/]+)?/(?P<path>.+)$',
+                              urlparse(old).path)
+            if not match:
+                print(f"❌ URL jsDelivr non reconnue pour {repo}: {old}")
+                return None
+            path = match.group('path')
+        new_path = resolve_redirect(path, self.fetch_redirects())
+        url = (f"{self.config.jsdelivr_base_url}/{repo}"
+               f"@{DEFAULT_CONFIG['github_branch']}/{new_path}")
+        print(f"🔗 {url}")
+        return url
+
     def interactive_menu(self):
         """Menu interactif"""
         while True:
@@ -161,16 +734,118 @@ def main():
         if command == "list":
             manager.list_videos()
         elif command == "delete" and len(sys.argv) > 2:
-            filename = sys.argv[2]
-            manager.delete_video(filename)
+            parser = argparse.ArgumentParser(prog="manage_videos.py delete")
+            parser.add_argument('filenames', nargs='+')
+            parser.add_argument('--journal',
+                                help="journal de reprise "
+                                     "(défaut: delete_journal.jsonl)")
+            args = parser.parse_args(sys.argv[2:])
+            if len(args.filenames) == 1 and not args.journal:
+                manager.delete_video(args.filenames[0])
+            else:
+                journal = manager.delete_many(args.filenames, args.journal)
+                sys.exit(1 if journal.summary(journal.batch_keys)['failed'] else 0)
         elif command == "url" and len(sys.argv) > 2:
             filename = sys.argv[2]
             manager.get_video_url(filename)
+        elif command == "verify":
+            parser = argparse.ArgumentParser(prog="manage_videos.py verify")
+            parser.add_argument('--base-url',
+                                help="URL de base jsDelivr (ex: serveur local de test)")
+            parser.add_argument('--concurrency', type=int, default=8)
+            parser.add_argument('--slow', type=float, default=1.0,
+                                help="seuil TTFB en secondes")
+            parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='status')
+            parser.add_argument('--json', action='store_true')
+            args = parser.parse_args(sys.argv[2:])
+            results = manager.verify_videos(args.base_url, args.concurrency, args.slow,
+                                            args.sort, args.json)
+            ok = results is not None and all(r['status'] in ('ok', 'slow')
+                                             for r in results)
+            sys.exit(0 if ok else 1)
+        elif command == "compact":
+            parser = argparse.ArgumentParser(prog="manage_videos.py compact")
+            parser.add_argument('--yes', action='store_true',
+                                help="exécuter (sinon simulation)")
+            parser.add_argument('--no-backup', action='store_true',
+                                help="ne pas conserver de branche de sauvegarde")
+            args = parser.parse_args(sys.argv[2:])
+            manager.compact_repository(dry_run=not args.yes, backup=not args.no_backup)
+        elif command == "dedupe":
+            parser = argparse.ArgumentParser(prog="manage_videos.py dedupe")
+            parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help="distance de Hamming moyenne maximale "
+                                     "(sur 64 bits)")
+            args = parser.parse_args(sys.argv[2:])
+            manager.dedupe_report(args.threshold)
+        elif command == "migrate":
+            parser = argparse.ArgumentParser(prog="manage_videos.py migrate")
+            parser.add_argument('layout', nargs='?', choices=LAYOUTS,
+                                help="organisation cible (défaut: VIDEO_LAYOUT)")
+            parser.add_argument('--yes', action='store_true',
+                                help="exécuter (sinon simulation)")
+            args = parser.parse_args(sys.argv[2:])
+            manager.migrate_layout(args.layout, dry_run=not args.yes)
+        elif command == "pull":
+            parser = argparse.ArgumentParser(prog="manage_videos.py pull")
+            parser.add_argument('dest', nargs='?', default='videos_backup',
+                                help="dossier de destination")
+            parser.add_argument('--source', choices=['raw', 'jsdelivr'], default='raw')
+            parser.add_argument('--base-url',
+                                help="URL de base de la source "
+                                     "(ex: serveur local de test)")
+            parser.add_argument('--concurrency', type=int, default=4)
+            parser.add_argument('--limit', help="débit max, ex: 500K ou 2M (octets/s)")
+            parser.add_argument('--json', action='store_true')
+            args = parser.parse_args(sys.argv[2:])
+            try:
+                rate_limit = mirror_pull.parse_rate(args.limit)
+            except ValueError as e:
+                parser.error(str(e))
+            results = manager.pull_videos(args.dest, args.source, args.base_url,
+                                          args.concurrency, rate_limit, args.json)
+            ok = results is not None and all(
+                r['status'] in ('downloaded', 'resumed', 'skipped') for r in results)
+            sys.exit(0 if ok else 1)
+        elif command == "stats":
+            parser = argparse.ArgumentParser(prog="manage_videos.py stats")
+            parser.add_argument('--period', choices=cdn_stats.PERIODS, default='month')
+            parser.add_argument('--base-url',
+                                help="URL de l'API de statistiques "
+                                     "(ex: serveur local de test)")
+            parser.add_argument('--refresh', action='store_true',
+                                help="ignorer le cache local")
+            parser.add_argument('--top', type=int,
+                                help="n'afficher que les N premières vidéos")
+            parser.add_argument('--target-kbps', type=int,
+                                default=cdn_stats.DEFAULT_TARGET_BITRATE // 1000,
+                                help="débit cible pour estimer le gain (kbit/s)")
+            parser.add_argument('--json', action='store_true')
+            args = parser.parse_args(sys.argv[2:])
+            manager.stats_report(args.period, args.base_url, args.refresh, args.top,
+                                 args.target_kbps * 1000, args.json)
+        elif command == "resolve" and len(sys.argv) > 2:
+            manager.resolve_url(sys.argv[2])
+        elif command == "snippet" and len(sys.argv) > 2:
+            filename = sys.argv[2]
+            manager.generate_snippets(filename)
         else:
             print("Usage:")
             print("  python manage_videos.py list")
-            print("  python manage_videos.py delete <filename>")
+            print("  python manage_videos.py delete <filename> [<filename>...] "
+                  "[--journal FICHIER]")
             print("  python manage_videos.py url <filename>")
+            print("  python manage_videos.py snippet <filename>")
+            print("  python manage_videos.py verify [--base-url URL] [--concurrency N] "
+                  "[--slow S] [--sort status|ttfb|name|size] [--json]")
+            print("  python manage_videos.py compact [--yes] [--no-backup]")
+            print("  python manage_videos.py dedupe [--threshold N]")
+            print("  python manage_videos.py migrate [flat|sharded] [--yes]")
+            print("  python manage_videos.py resolve <ancienne URL ou chemin>")
+            print("  python manage_videos.py pull [dossier] [--source raw|jsdelivr] "
+                  "[--base-url URL] [--concurrency N] [--limit 2M] [--json]")
+            print("  python manage_videos.py stats [--period month] [--base-url URL] "
+                  "[--refresh] [--top N] [--target-kbps N] [--json]")
             print("  python manage_videos.py  (mode interactif)")
     else:
         # Mode interactif
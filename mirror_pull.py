@@ -0,0 +1,187 @@
+"""
+Téléchargement parallèle de la bibliothèque (sauvegarde, miroir)
+Reprise des fichiers partiels par requêtes Range, vérification du SHA git de
+chaque blob et limite de bande passante globale
+"""
+
+import os
+import re
+import time
+import hashlib
+import asyncio
+import aiohttp
+from pathlib import Path
+
+CHUNK_SIZE = 256 * 1024
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+
+PARTIAL_SUFFIX = '.part'
+
+STATUS_ICONS = {'downloaded': '⬇️', 'resumed': '⏯️', 'skipped': '⏭️', 'corrupt': '❌',
+                'error': '⚠️'}
+
+RATE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?$', re.IGNORECASE)
+RATE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_rate(value):
+    """Convertit '500K', '2M' ou '1.5m' en octets par seconde (None : illimité)"""
+    if not value:
+        return None
+    match = RATE_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Limite de débit invalide: {value}")
+    return int(float(match.group(1)) * RATE_UNITS[match.group(2).lower()])
+
+
+def blob_hasher(size):
+    """SHA-1 au format blob git (en-tête 'blob <taille>\\0')"""
+    return hashlib.sha1(f"blob {size}\0".encode())
+
+
+def file_blob_sha(path, size=None):
+    """SHA git d'un fichier local (None s'il n'existe pas)"""
+    try:
+        size = os.path.getsize(path) if size is None else size
+        digest = blob_hasher(size)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+class BandwidthLimiter:
+    """Seau à jetons partagé entre tous les téléchargements"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.available = rate or 0
+        self.last = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def consume(self, amount):
+        if not self.rate:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            self.available = min(self.rate,
+                                 self.available + (now - self.last) * self.rate)
+            self.last = now
+            self.available -= amount
+            if self.available < 0:
+                await asyncio.sleep(-self.available / self.rate)
+
+
+async def download_video(session, semaphore, limiter, entry, url, dest_dir):
+    """Télécharge une vidéo vers dest_dir/<chemin du repository>
+
+    Un fichier déjà présent avec le bon SHA est ignoré ; un fichier .part
+    est repris à sa taille actuelle. Le fichier final n'apparaît qu'une fois
+    son SHA vérifié.
+    """
+    target = Path(dest_dir) / entry['path']
+    partial = target.with_name(target.name + PARTIAL_SUFFIX)
+    result = {'name': entry['name'], 'path': str(target), 'url': url,
+              'size': entry['size'], 'status': 'downloaded', 'transferred': 0,
+              'error': None}
+
+    if target.exists() and target.stat().st_size == entry['size']:
+        if await asyncio.to_thread(file_blob_sha, target) == entry['sha']:
+            result['status'] = 'skipped'
+            return result
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    async with semaphore:
+        for attempt in range(2):
+            offset = partial.stat().st_size if partial.exists() else 0
+            if offset > entry['size']:
+                partial.unlink()
+                offset = 0
+            try:
+                result['transferred'] += await fetch_range(session, limiter, url,
+                                                           partial, offset,
+                                                           entry['size'])
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+                # Le fichier .part est conservé pour une reprise ultérieure
+                result['status'] = 'error'
+                result['error'] = str(e) or type(e).__name__
+                return result
+            if offset and result['status'] == 'downloaded':
+                result['status'] = 'resumed'
+
+            if await asyncio.to_thread(file_blob_sha, partial) == entry['sha']:
+                os.replace(partial, target)
+                return result
+            # Reprise sur un fichier partiel corrompu : recommencer de zéro une fois
+            partial.unlink()
+            if not offset:
+                break
+        result['status'] = 'corrupt'
+        result['error'] = "SHA différent du blob attendu"
+    return result
+
+
+async def fetch_range(session, limiter, url, partial, offset, size):
+    """Télécharge url à partir de offset dans partial, retourne les octets reçus"""
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    if offset >= size:
+        return 0
+    async with session.get(url, headers=headers) as response:
+        if response.status == 200 and offset:
+            # Range ignoré par le serveur : tout reprendre
+            offset = 0
+        elif response.status not in (200, 206):
+            raise RuntimeError(f"HTTP {response.status}")
+
+        transferred = 0
+        with open(partial, 'r+b' if offset else 'wb') as f:
+            f.seek(offset)
+            f.truncate()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                await limiter.consume(len(chunk))
+                f.write(chunk)
+                transferred += len(chunk)
+    return transferred
+
+
+async def pull_videos(entries, url_for, dest_dir, concurrency=4, rate_limit=None,
+                      headers=None):
+    """Télécharge toutes les vidéos avec une concurrence bornée
+
+    `entries` sont des entrées de listing (name, path, size, sha), `url_for`
+    construit l'URL de téléchargement depuis une entrée.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = BandwidthLimiter(rate_limit)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    headers = {'User-Agent': 'GitHub-jsDelivr-Video-Mirror', **(headers or {})}
+    async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT, connector=connector,
+                                     headers=headers) as session:
+        return await asyncio.gather(*(
+            download_video(session, semaphore, limiter, entry, url_for(entry), dest_dir)
+            for entry in entries
+        ))
+
+
+def format_report(results, elapsed):
+    """Rapport texte, une ligne par vidéo puis un résumé"""
+    lines = []
+    for result in results:
+        error = f" ({result['error']})" if result['error'] else ""
+        lines.append(f"{STATUS_ICONS[result['status']]} {result['status']:<10} "
+                     f"{result['name']}{error}")
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    transferred = sum(result['transferred'] for result in results)
+    rate = transferred / elapsed / (1024 * 1024) if elapsed else 0
+    lines.append("")
+    lines.append(f"📊 {len(results)} vidéo(s): "
+                 + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+    lines.append(f"📦 {transferred / (1024 * 1024):.1f} MB transférés "
+                 f"en {elapsed:.1f}s ({rate:.1f} MB/s)")
+    return "\n".join(lines)
@@ -0,0 +1,239 @@
+"""
+Faststart MP4 en pur Python
+Déplace l'atome moov avant mdat (sans ré-encodage) pour que la lecture puisse
+démarrer sans télécharger la fin du fichier
+"""
+
+import os
+import mmap
+import shutil
+import struct
+import tempfile
+from collections import namedtuple
+
+# Boîtes contenant le chemin moov -> stbl, où se trouvent stco/co64
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+FASTSTART_EXTENSIONS = {'.mp4', '.mov', '.m4v'}
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+Box = namedtuple('Box', ['type', 'offset', 'size', 'header'])
+
+
+class Mp4Error(ValueError):
+    """Fichier MP4 invalide ou non supporté"""
+
+
+def read_box_header(data, offset, end):
+    """Lit l'en-tête d'une boîte, retourne (type, taille totale, taille d'en-tête)"""
+    if offset + 8 > end:
+        raise Mp4Error(f"En-tête de boîte tronqué à l'offset {offset}")
+    size, = struct.unpack_from('>I', data, offset)
+    box_type = bytes(data[offset + 4:offset + 8])
+    header = 8
+    if size == 1:
+        if offset + 16 > end:
+            raise Mp4Error(f"Taille 64 bits tronquée à l'offset {offset}")
+        size, = struct.unpack_from('>Q', data, offset + 8)
+        header = 16
+    elif size == 0:
+        size = end - offset
+    if size < header or offset + size > end:
+        raise Mp4Error(f"Taille de boîte invalide pour {box_type!r} "
+                       f"à l'offset {offset}")
+    return box_type, size, header
+
+
+def iter_boxes(data, start, end):
+    """Itère sur les boîtes contiguës entre start et end"""
+    offset = start
+    while end - offset >= 8:
+        box_type, size, header = read_box_header(data, offset, end)
+        yield Box(box_type, offset, size, header)
+        offset += size
+
+
+def parse_tree(data, start, end):
+    """Parse récursivement les boîtes conteneurs, les autres restent brutes
+
+    Chaque nœud est une liste [type, contenu] où contenu est soit une liste
+    d'enfants, soit le payload en bytes.
+    """
+    nodes = []
+    for box in iter_boxes(data, start, end):
+        body_start, body_end = box.offset + box.header, box.offset + box.size
+        if box.type in CONTAINER_BOXES:
+            nodes.append([box.type, parse_tree(data, body_start, body_end)])
+        else:
+            nodes.append([box.type, bytes(data[body_start:body_end])])
+    return nodes
+
+
+def serialize_tree(nodes):
+    """Resérialise un arbre de boîtes"""
+    parts = []
+    for box_type, content in nodes:
+        payload = serialize_tree(content) if isinstance(content, list) else content
+        size = 8 + len(payload)
+        if size > 0xFFFFFFFF:
+            parts.append(struct.pack('>I4sQ', 1, box_type, size + 8))
+        else:
+            parts.append(struct.pack('>I4s', size, box_type))
+        parts.append(payload)
+    return b''.join(parts)
+
+
+def patch_chunk_offsets(nodes, shift, force_co64=False, stats=None):
+    """Applique `shift` à toutes les entrées stco/co64 de l'arbre
+
+    Avec force_co64, les tables stco sont converties en co64 (offsets 64 bits).
+    Retourne les statistiques (tables et entrées modifiées).
+    """
+    if stats is None:
+        stats = {'tables': 0, 'entries': 0, 'converted': 0}
+    for node in nodes:
+        box_type, content = node
+        if isinstance(content, list):
+            patch_chunk_offsets(content, shift, force_co64, stats)
+            continue
+        if box_type not in (b'stco', b'co64'):
+            continue
+
+        version_flags = content[:4]
+        count, = struct.unpack_from('>I', content, 4)
+        width = 'I' if box_type == b'stco' else 'Q'
+        expected = 8 + count * struct.calcsize(width)
+        if len(content) < expected:
+            raise Mp4Error(f"Table {box_type.decode()} tronquée")
+        offsets = [shift(offset)
+                   for offset in struct.unpack_from(f'>{count}{width}', content, 8)]
+
+        if box_type == b'stco' and force_co64:
+            node[0], width = b'co64', 'Q'
+            stats['converted'] += 1
+        elif box_type == b'stco' and offsets and max(offsets) > 0xFFFFFFFF:
+            raise OverflowError("Offset stco supérieur à 32 bits")
+        node[1] = version_flags + struct.pack(f'>I{count}{width}', count, *offsets)
+        stats['tables'] += 1
+        stats['entries'] += count
+    return stats
+
+
+def needs_faststart(path):
+    """Indique si le moov d'un MP4 se trouve après le mdat"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            order = [box.type for box in iter_boxes(mm, 0, size)
+                     if box.type in (b'moov', b'mdat')]
+    return bool(order) and order[0] == b'mdat' and b'moov' in order
+
+
+def faststart(path, output_path=None):
+    """Relocalise moov devant mdat sans charger le fichier en mémoire
+
+    Le fichier est lu via mmap et réécrit par blocs. Sans output_path, le
+    fichier est remplacé de manière atomique. Retourne un rapport
+    {'moved', 'reason', 'moov_size', 'shift', 'tables', 'entries', 'converted'}.
+    """
+    report = {'moved': False, 'reason': None, 'moov_size': 0, 'shift': 0,
+              'tables': 0, 'entries': 0, 'converted': 0}
+
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size == 0:
+            raise Mp4Error("Fichier vide")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            boxes = list(iter_boxes(mm, 0, file_size))
+            types = [box.type for box in boxes]
+
+            if b'moov' not in types:
+                raise Mp4Error("Atome moov introuvable (fichier MP4 invalide ?)")
+            if b'moof' in types:
+                report['reason'] = 'MP4 fragmenté, déjà streamable'
+                return report
+            moov_index = types.index(b'moov')
+            mdat_index = types.index(b'mdat') if b'mdat' in types else None
+            if mdat_index is None or moov_index < mdat_index:
+                report['reason'] = 'moov déjà en tête'
+                return report
+
+            moov = boxes[moov_index]
+            first_mdat = boxes[mdat_index]
+            tree = parse_tree(mm, moov.offset + moov.header, moov.offset + moov.size)
+            if any(box_type == b'cmov' for box_type, _ in tree):
+                raise Mp4Error("moov compressé (cmov) non supporté")
+
+            def build(force_co64):
+                nodes = _copy_tree(tree)
+                converted = 0
+                if force_co64:
+                    # Convertir d'abord stco -> co64 : la taille du moov en dépend
+                    stats = patch_chunk_offsets(nodes, lambda offset: offset, True)
+                    converted = stats['converted']
+                new_size = len(serialize_tree([[b'moov', nodes]]))
+
+                def shift(offset):
+                    # Les données entre le premier mdat et l'ancien moov sont
+                    # décalées de la taille du nouveau moov, celles après l'ancien
+                    # moov de la différence de taille
+                    if first_mdat.offset <= offset < moov.offset:
+                        return offset + new_size
+                    if offset >= moov.offset + moov.size:
+                        return offset + new_size - moov.size
+                    return offset
+
+                stats = patch_chunk_offsets(nodes, shift)
+                stats['converted'] = converted
+                return serialize_tree([[b'moov', nodes]]), new_size, stats
+
+            try:
+                new_moov, new_size, stats = build(force_co64=False)
+            except OverflowError:
+                new_moov, new_size, stats = build(force_co64=True)
+
+            target = output_path or path
+            directory = os.path.dirname(os.path.abspath(target))
+            fd, tmp_path = tempfile.mkstemp(prefix='.faststart-', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    for box in boxes[:mdat_index]:
+                        _copy_range(mm, out, box.offset, box.size)
+                    out.write(new_moov)
+                    for index, box in enumerate(boxes[mdat_index:], mdat_index):
+                        if index != moov_index:
+                            _copy_range(mm, out, box.offset, box.size)
+                    # Conserver d'éventuels octets de fin hors boîte
+                    last = boxes[-1]
+                    tail = last.offset + last.size
+                    _copy_range(mm, out, tail, file_size - tail)
+                    out.flush()
+                    os.fsync(out.fileno())
+                shutil.copymode(path, tmp_path)
+                os.replace(tmp_path, target)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    report.update(stats)
+    report.update({'moved': True, 'moov_size': new_size, 'shift': new_size})
+    return report
+
+
+def _copy_tree(nodes):
+    """Copie profonde d'un arbre de boîtes (les payloads bytes sont immuables)"""
+    return [[box_type, _copy_tree(content) if isinstance(content, list) else content]
+            for box_type, content in nodes]
+
+
+def _copy_range(mm, out, offset, length):
+    """Copie une plage du mmap vers un fichier par blocs"""
+    end = offset + length
+    while offset < end:
+        step = min(COPY_CHUNK_SIZE, end - offset)
+        out.write(mm[offset:offset + step])
+        offset += step
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Optimiseur de taille pour vidéos de fond
+Cherche les réglages (CRF, résolution, fps) qui tiennent dans un budget de taille
+ou de débit, au-dessus d'un plancher de qualité (SSIM), via ffmpeg
+"""
+
+import os
+import re
+import sys
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from fingerprint import ffmpeg_binary
+from video_probe import probe
+
+# Bornes de la recherche CRF (libx264) : plus le CRF est élevé,
+# plus le fichier est petit
+CRF_MIN, CRF_MAX = 18, 40
+
+# Hauteurs testées, de la meilleure à la plus faible
+HEIGHT_LADDER = [2160, 1440, 1080, 720, 540, 480, 360]
+
+# Plancher de qualité par défaut (SSIM par rapport à la source)
+DEFAULT_MIN_SSIM = 0.95
+
+# Une vidéo de fond n'a pas besoin de plus de 30 images/s
+DEFAULT_MAX_FPS = 30
+
+SSIM_PATTERN = re.compile(r'All:([0-9.]+)')
+
+
+class OptimizationError(RuntimeError):
+    """Échec de l'encodage ou de la mesure de qualité"""
+
+
+def encode(source, output, crf, height, fps, keep_audio, preset='medium'):
+    """Encode une variante H.264 (faststart), retourne sa taille en octets"""
+    filters = [f"scale=-2:{height}"]
+    if fps:
+        filters.append(f"fps={fps}")
+    command = [ffmpeg_binary(), '-v', 'error', '-y', '-i', str(source),
+               '-vf', ','.join(filters), '-c:v', 'libx264', '-preset', preset,
+               '-crf', str(crf), '-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+    command += ['-c:a', 'aac', '-b:a', '96k'] if keep_audio else ['-an']
+    command.append(str(output))
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', 'replace').strip()
+        raise OptimizationError(f"ffmpeg: {error[:200]}")
+    return os.path.getsize(output)
+
+
+def measure_ssim(source, candidate, width, height):
+    """SSIM moyen d'une variante par rapport à la source"""
+    command = [ffmpeg_binary(), '-v', 'info', '-i', str(candidate), '-i', str(source),
+               '-lavfi', (f"[0:v]scale={width}:{height}[a];"
+                          f"[1:v]scale={width}:{height}[b];[a][b]ssim"),
+               '-f', 'null', '-']
+    result = subprocess.run(command, capture_output=True)
+    match = SSIM_PATTERN.search(result.stderr.decode('utf-8', 'replace'))
+    if result.returncode != 0 or not match:
+        raise OptimizationError("mesure SSIM impossible")
+    return float(match.group(1))
+
+
+class VideoOptimizer:
+    def __init__(self, source, target_size=None, target_bitrate=None,
+                 min_ssim=DEFAULT_MIN_SSIM, muted=True, max_fps=DEFAULT_MAX_FPS,
+                 preset='medium', work_dir=None):
+        self.source = Path(source)
+        self.info = probe(source)
+        self.muted = muted
+        self.min_ssim = min_ssim
+        self.preset = preset
+        self.warnings = []
+        # Budget en octets (taille directe ou débit x durée)
+        self.budget = target_size
+        if target_bitrate and self.info.get('duration'):
+            bitrate_budget = int(target_bitrate * self.info['duration'] / 8)
+            self.budget = (min(self.budget, bitrate_budget) if self.budget
+                           else bitrate_budget)
+        elif target_bitrate:
+            mode = ("budget de taille seul" if self.budget
+                    else "plancher de qualité seul")
+            self.warnings.append(f"durée inconnue, débit cible ignoré ({mode})")
+            print(f"⚠️ Durée inconnue: débit cible ignoré, optimisation sur le {mode}")
+
+        source_fps = self.probe_fps()
+        if max_fps and (source_fps is None or source_fps > max_fps):
+            self.fps = max_fps
+        else:
+            self.fps = None
+        self.heights = [self.info['height']] + [h for h in HEIGHT_LADDER
+                                                if h < self.info['height']]
+        self.candidates = {}
+        self.owns_work_dir = work_dir is None
+        self.work_dir = Path(work_dir or tempfile.mkdtemp(prefix='optimize-'))
+
+    def probe_fps(self):
+        """Cadence de la source (None si inconnue)"""
+        result = subprocess.run([ffmpeg_binary(), '-i', str(self.source)],
+                                capture_output=True)
+        match = re.search(r'(\d+(?:\.\d+)?) fps',
+                          result.stderr.decode('utf-8', 'replace'))
+        return float(match.group(1)) if match else None
+
+    def candidate(self, crf, height):
+        """Encode (une seule fois) la variante crf/hauteur, retourne son dict"""
+        key = (crf, height)
+        if key not in self.candidates:
+            output = self.work_dir / f"{self.source.stem}-crf{crf}-{height}p.mp4"
+            size = encode(self.source, output, crf, height, self.fps, not self.muted,
+                          self.preset)
+            self.candidates[key] = {'path': output, 'crf': crf, 'height': height,
+                                    'size': size, 'ssim': None}
+            print(f"   🎛️ CRF {crf} • {height}p → {size / (1024 * 1024):.2f} MB")
+        return self.candidates[key]
+
+    def ssim(self, candidate):
+        if candidate['ssim'] is None:
+            candidate['ssim'] = measure_ssim(self.source, candidate['path'],
+                                             self.info['width'], self.info['height'])
+        return candidate['ssim']
+
+    def search_budget(self, height):
+        """Plus petit CRF (meilleure qualité) tenant dans le budget à cette hauteur"""
+        if self.candidate(CRF_MAX, height)['size'] > self.budget:
+            return None
+        low, high = CRF_MIN, CRF_MAX
+        while low < high:
+            middle = (low + high) // 2
+            if self.candidate(middle, height)['size'] <= self.budget:
+                high = middle
+            else:
+                low = middle + 1
+        return self.candidate(low, height)
+
+    def search_floor(self, height):
+        """Plus grand CRF (plus petit fichier) restant au-dessus du plancher SSIM"""
+        if self.ssim(self.candidate(CRF_MIN, height)) < self.min_ssim:
+            return None
+        low, high = CRF_MIN, CRF_MAX
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.ssim(self.candidate(middle, height)) >= self.min_ssim:
+                low = middle
+            else:
+                high = middle - 1
+        return self.candidate(low, height)
+
+    def run(self):
+        """Lance la recherche, retourne le meilleur candidat (ou None)
+
+        Avec un budget : la plus haute résolution dont le meilleur CRF tenant
+        dans le budget reste au-dessus du plancher. Sans budget : le plus petit
+        fichier au-dessus du plancher à la résolution d'origine.
+
+        Si le budget est tenu mais jamais au-dessus du plancher, l'encodage
+        dans le budget de meilleure SSIM est retenu ('below_floor'). Si rien
+        ne tient dans le budget, le plus petit encodage ('over_budget').
+        """
+        if not self.budget:
+            return self.search_floor(self.heights[0])
+
+        in_budget = []
+        for height in self.heights:
+            candidate = self.search_budget(height)
+            if candidate and self.ssim(candidate) >= self.min_ssim:
+                return candidate
+            if candidate:
+                in_budget.append(candidate)
+
+        if in_budget:
+            best = max(in_budget, key=lambda c: c['ssim'])
+            best['below_floor'] = True
+            return best
+
+        smallest = min(self.candidates.values(), key=lambda c: c['size'], default=None)
+        if smallest:
+            smallest['over_budget'] = True
+        return smallest
+
+    def cleanup(self, keep=None):
+        """Supprime les encodages intermédiaires (sauf `keep`)"""
+        for candidate in self.candidates.values():
+            if candidate['path'] != keep and candidate['path'].exists():
+                os.remove(candidate['path'])
+        if self.owns_work_dir and not any(self.work_dir.iterdir()):
+            self.work_dir.rmdir()
+
+
+def optimize(source, output=None, **options):
+    """Optimise une vidéo et retourne un rapport
+
+    Le fichier résultant garde le nom de la source (extension .mp4) dans
+    `output` ou un dossier temporaire. Si aucun encodage n'est plus petit
+    que l'original, l'original est conservé ('path' pointe alors dessus).
+    'work_dir' désigne le dossier temporaire créé pour le résultat (à
+    supprimer par l'appelant), None s'il n'en reste aucun.
+    """
+    print(f"🗜️ Optimisation de {Path(source).name}...")
+    optimizer = VideoOptimizer(source, **options)
+    original_size = optimizer.info['size']
+    try:
+        best = optimizer.run()
+    except Exception:
+        optimizer.cleanup()
+        raise
+
+    report = {
+        'original_size': original_size,
+        'optimized_size': original_size,
+        'saved': 0,
+        'path': str(source),
+        'crf': None,
+        'height': optimizer.info['height'],
+        'fps': optimizer.fps,
+        'ssim': None,
+        'audio_removed': optimizer.muted and optimizer.info.get('has_audio', False),
+        'budget': optimizer.budget,
+        'below_floor': False,
+        'over_budget': False,
+        'encodes': len(optimizer.candidates),
+        'warnings': optimizer.warnings,
+        'work_dir': None,
+    }
+
+    if best and best['size'] < original_size:
+        target = (Path(output) if output
+                  else optimizer.work_dir / f"{Path(source).stem}.mp4")
+        shutil.move(best['path'], target)
+        report.update(path=str(target), optimized_size=best['size'],
+                      saved=original_size - best['size'],
+                      crf=best['crf'], height=best['height'],
+                      ssim=optimizer.ssim({**best, 'path': target}),
+                      below_floor=best.get('below_floor', False),
+                      over_budget=best.get('over_budget', False))
+        optimizer.cleanup(keep=target)
+        if optimizer.owns_work_dir and optimizer.work_dir.exists():
+            report['work_dir'] = str(optimizer.work_dir)
+    else:
+        optimizer.cleanup()
+        report['audio_removed'] = False
+
+    print(format_report(report))
+    return report
+
+
+def format_report(report):
+    """Résumé lisible d'une optimisation"""
+    if not report['saved']:
+        return "ℹ️ Aucun encodage plus petit que l'original, fichier conservé tel quel"
+    details = f"   CRF {report['crf']} • {report['height']}p"
+    if report['fps']:
+        details += f" • {report['fps']} fps"
+    details += f" • SSIM {report['ssim']:.3f}"
+    if report['audio_removed']:
+        details += " • audio retiré"
+    lines = [
+        f"✅ {report['original_size'] / (1024 * 1024):.1f} MB → "
+        f"{report['optimized_size'] / (1024 * 1024):.1f} MB "
+        f"({report['saved'] / (1024 * 1024):.1f} MB économisés, "
+        f"-{100 * report['saved'] / report['original_size']:.0f}%)",
+        details,
+    ]
+    if report['below_floor']:
+        lines.append("⚠️ Plancher de qualité non atteint dans le budget : "
+                     "encodage de meilleure SSIM retenu")
+    if report['over_budget']:
+        lines.append("⚠️ Budget inatteignable : plus petit encodage retenu")
+    return "\n".join(lines)
+
+
+def add_optimize_arguments(parser):
+    """Options d'optimisation communes aux CLIs"""
+    parser.add_argument('--target-mb', type=float, help="budget de taille en MB")
+    parser.add_argument('--target-kbps', type=float, help="budget de débit en kbit/s")
+    parser.add_argument('--min-ssim', type=float, default=DEFAULT_MIN_SSIM,
+                        help="plancher de qualité (SSIM)")
+    parser.add_argument('--keep-audio', action='store_true',
+                        help="conserver la piste audio")
+
+
+def optimize_options(args):
+    """Convertit les arguments CLI en options de VideoOptimizer"""
+    return {
+        'target_size': int(args.target_mb * 1024 * 1024) if args.target_mb else None,
+        'target_bitrate': args.target_kbps * 1000 if args.target_kbps else None,
+        'min_ssim': args.min_ssim,
+        'muted': not args.keep_audio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Réduit une vidéo pour tenir dans un budget de taille")
+    parser.add_argument('video')
+    parser.add_argument('-o', '--output', help="fichier de sortie (.mp4)")
+    add_optimize_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        report = optimize(args.video, args.output, **optimize_options(args))
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ Erreur: {e}")
+        sys.exit(1)
+    print(f"📁 Résultat: {report['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Cache disque des vidéos fraîchement uploadées
+Garde une copie locale (LRU bornée en taille) servie par l'interface web tant que
+jsDelivr n'a pas encore la vidéo
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from config import DEFAULT_CONFIG
+
+DEFAULT_CACHE_DIR = os.getenv('PREVIEW_CACHE_DIR', 'preview_cache')
+
+INDEX_NAME = 'index.json'
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class PreviewCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes or DEFAULT_CONFIG['preview_cache_mb'] * 1024 * 1024
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.load()
+
+    @property
+    def index_path(self):
+        return self.directory / INDEX_NAME
+
+    def load(self):
+        """Charge l'index (les entrées dont le fichier a disparu sont ignorées)"""
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get('videos', {})
+            self.entries = {name: entry for name, entry in entries.items()
+                            if self.path_for(name).exists()}
+        return self.entries
+
+    def save(self):
+        """Sauvegarde l'index de manière atomique"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(INDEX_NAME + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'videos': self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def path_for(self, name):
+        # Les noms viennent du repository : on ne garde que le nom de base
+        return self.directory / Path(name).name
+
+    def total_size(self):
+        return sum(entry['size'] for entry in self.entries.values())
+
+    def add(self, source_path, name):
+        """Copie les octets uploadés dans le cache, retourne l'entrée"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        size = os.path.getsize(source_path)
+        if size > self.max_bytes:
+            return None
+
+        target = self.path_for(name)
+        tmp_path = target.with_name(target.name + '.tmp')
+        digest = hashlib.sha1(f"blob {size}\0".encode())
+        with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                dst.write(chunk)
+        os.replace(tmp_path, target)
+
+        with self.lock:
+            self.entries[name] = {'size': size, 'sha': digest.hexdigest(),
+                                  'added': time.time(), 'last_access': time.time(),
+                                  'confirmed': False}
+            self.evict(keep=name)
+            self.save()
+        return self.entries[name]
+
+    def evict(self, keep=None):
+        """Supprime les entrées les moins récemment lues au-delà de max_bytes
+
+        Les vidéos déjà confirmées sur le CDN partent en premier.
+        """
+        total = self.total_size()
+        order = sorted(self.entries, key=lambda n: (not self.entries[n]['confirmed'],
+                                                    self.entries[n]['last_access']))
+        for name in order:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self.entries.pop(name)['size']
+            self.path_for(name).unlink(missing_ok=True)
+
+    def get(self, name):
+        """Entrée d'une vidéo en cache (marquée comme lue), ou None"""
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None or not self.path_for(name).exists():
+                return None
+            entry['last_access'] = time.time()
+        return entry
+
+    def pending(self):
+        """Vidéos en cache pas encore confirmées sur le CDN"""
+        return {name: entry for name, entry in self.entries.items()
+                if not entry['confirmed']}
+
+    def confirm(self, name):
+        """Marque la copie CDN comme disponible (la copie locale devient évinçable)"""
+        with self.lock:
+            if name in self.entries:
+                self.entries[name]['confirmed'] = True
+                self.save()
+
+    def remove(self, name):
+        """Retire une vidéo du cache"""
+        with self.lock:
+            if self.entries.pop(name, None) is not None:
+                self.path_for(name).unlink(missing_ok=True)
+                self.save()
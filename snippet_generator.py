@@ -0,0 +1,373 @@
+"""
+Générateur de snippets d'intégration vidéo orientés performance
+Sources multiples (MIME + codecs), poster, preconnect/preload et lecture différée
+"""
+
+import re
+import json
+import html
+from pathlib import Path
+from urllib.parse import urlparse
+from config import Config, DEFAULT_CONFIG
+from video_layout import VideoLayout
+
+MIME_TYPES = {
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.mov': 'video/quicktime',
+    '.mkv': 'video/x-matroska',
+    '.avi': 'video/x-msvideo',
+}
+
+# Ordre de préférence à hauteur égale : les conteneurs les plus compacts d'abord
+FORMAT_PRIORITY = ['.webm', '.mp4', '.mov', '.mkv', '.avi']
+
+POSTER_EXTENSIONS = ['.avif', '.webp', '.jpg', '.jpeg', '.png']
+
+# "clip_20240101_120000_abcd1234-720p.webm"
+#   -> base "clip_20240101_120000_abcd1234", hauteur 720
+VARIANT_PATTERN = re.compile(r'^(?P<base>.+?)(?:-(?P<height>\d{3,4})p)?$')
+
+LAZY_LOADER_JS = """(function () {
+  function pick(video) {
+    var sources = video.querySelectorAll('source[data-src]');
+    for (var i = 0; i < sources.length; i++) {
+      var s = sources[i], media = s.getAttribute('media');
+      if (media && !window.matchMedia(media).matches) continue;
+      if (!video.canPlayType(s.getAttribute('type'))) continue;
+      return s.getAttribute('data-src');
+    }
+    return null;
+  }
+  function start(video) {
+    var src = pick(video);
+    if (!src) return;
+    video.src = src;
+    video.load();
+    var p = video.play();
+    if (p && p.catch) p.catch(function () {});
+  }
+  var videos = document.querySelectorAll('video[data-lazy-video]');
+  if (!('IntersectionObserver' in window)) {
+    Array.prototype.forEach.call(videos, start);
+    return;
+  }
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      var video = entry.target;
+      if (entry.isIntersecting) {
+        if (!video.src) start(video); else video.play().catch(function () {});
+      } else if (video.src) {
+        video.pause();
+      }
+    });
+  }, { rootMargin: '200px' });
+  Array.prototype.forEach.call(videos, function (v) { observer.observe(v); });
+})();"""
+
+BACKGROUND_CSS = """.video-background {
+    position: fixed;
+    top: 0;
+    left: 0;
+    width: 100%;
+    height: 100%;
+    z-index: -1;
+    overflow: hidden;
+}
+
+.video-background video {
+    width: 100%;
+    height: 100%;
+    object-fit: cover;
+}"""
+
+
+def split_variant(filename):
+    """Retourne (nom de base, hauteur ou None) pour un nom de fichier vidéo"""
+    match = VARIANT_PATTERN.match(Path(filename).stem)
+    height = match.group('height')
+    return match.group('base'), int(height) if height else None
+
+
+def mime_type(filename, codecs=None):
+    """Type MIME d'une source, avec le paramètre codecs s'il est connu"""
+    mime = MIME_TYPES.get(Path(filename).suffix.lower(), 'video/mp4')
+    if codecs:
+        return f'{mime}; codecs="{", ".join(codecs)}"'
+    return mime
+
+
+class SnippetGenerator:
+    def __init__(self, username, repo, ref=None, layout=None, base_url=None):
+        self.username = username
+        self.repo = repo
+        self.ref = ref or DEFAULT_CONFIG['github_branch']
+        if layout is None or base_url is None:
+            # Organisation et URL de base du .env (VIDEO_LAYOUT, JSDELIVR_BASE_URL)
+            config = Config()
+            layout = layout or VideoLayout(config.video_layout)
+            base_url = base_url or config.jsdelivr_base_url
+        self.layout = layout
+        self.base_url = base_url.rstrip('/')
+
+    @property
+    def cdn_origin(self):
+        """Origine du CDN, pour preconnect et dns-prefetch"""
+        url = urlparse(self.base_url)
+        return f"{url.scheme}://{url.netloc}"
+
+    def cdn_url(self, path):
+        """URL jsDelivr d'un fichier du repository"""
+        return f"{self.base_url}/{self.username}/{self.repo}@{self.ref}/{path}"
+
+    def collect(self, filename, videos, posters=(), metadata=None):
+        """Rassemble les variantes et le poster d'une vidéo depuis un listing
+
+        `videos` et `posters` sont des listes de noms (ou d'entrées avec une
+        clé 'name'), `metadata` associe un nom de fichier à ses métadonnées
+        (codecs, hauteur...) issues du catalogue.
+        """
+        metadata = metadata or {}
+        base, _ = split_variant(filename)
+
+        variants = []
+        for item in videos:
+            name = item['name'] if isinstance(item, dict) else item
+            variant_base, height = split_variant(name)
+            if variant_base != base:
+                continue
+            meta = metadata.get(name, {})
+            # Chemin du listing s'il est connu (vidéo restée à un ancien emplacement)
+            path = item.get('path') if isinstance(item, dict) else None
+            variants.append({
+                'name': name,
+                'url': self.cdn_url(path or self.layout.path(name)),
+                'type': mime_type(name, meta.get('codecs')),
+                'height': height or meta.get('height'),
+            })
+
+        poster = None
+        poster_names = {(p['name'] if isinstance(p, dict) else p) for p in posters}
+        for extension in POSTER_EXTENSIONS:
+            if base + extension in poster_names:
+                poster = self.cdn_url(
+                    f"{DEFAULT_CONFIG['poster_folder']}/{base}{extension}")
+                break
+
+        return self.order_sources(variants), poster
+
+    def order_sources(self, variants):
+        """Trie les sources : petites résolutions (avec media query) d'abord
+
+        La plus grande résolution sert de source par défaut, sans media query.
+        """
+        heights = sorted({v['height'] for v in variants if v['height']})
+        largest = heights[-1] if heights else None
+
+        def priority(variant):
+            extension = Path(variant['name']).suffix.lower()
+            if extension in FORMAT_PRIORITY:
+                format_rank = FORMAT_PRIORITY.index(extension)
+            else:
+                format_rank = len(FORMAT_PRIORITY)
+            height = variant['height'] or largest or 0
+            return (height == largest or not variant['height'], height, format_rank)
+
+        ordered = sorted(variants, key=priority)
+        for variant in ordered:
+            height = variant['height']
+            if height and height != largest:
+                variant['media'] = f'(max-width: {int(height * 16 / 9)}px)'
+            else:
+                variant['media'] = None
+        return ordered
+
+    def head_hints(self, poster=None):
+        """Balises <link> à placer dans le <head>"""
+        hints = [f'<link rel="preconnect" href="{self.cdn_origin}" crossorigin>',
+                 f'<link rel="dns-prefetch" href="{self.cdn_origin}">']
+        if poster:
+            hints.append(f'<link rel="preload" as="image" '
+                         f'href="{html.escape(poster)}">')
+        return "\n".join(hints)
+
+    def render_sources(self, sources, attribute='data-src', indent='        '):
+        """Balises <source> (src différé par défaut)"""
+        lines = []
+        for source in sources:
+            media = f' media="{source["media"]}"' if source['media'] else ''
+            lines.append(f'{indent}<source {attribute}="{html.escape(source["url"])}" '
+                         f'type="{html.escape(source["type"])}"{media}>')
+        return "\n".join(lines)
+
+    def render_html(self, filename, sources, poster=None):
+        """Snippet HTML autonome (hints, vidéo différée, CSS, loader)"""
+        poster_attr = f' poster="{html.escape(poster)}"' if poster else ''
+        return f"""<!-- Background vidéo - {filename} -->
+<!-- À placer dans le <head> -->
+{self.head_hints(poster)}
+
+<div class="video-background">
+    <video data-lazy-video muted loop playsinline preload="none"{poster_attr}>
+{self.render_sources(sources)}
+        Votre navigateur ne supporte pas les vidéos HTML5.
+    </video>
+</div>
+
+<style>
+{BACKGROUND_CSS}
+</style>
+
+<script>
+{LAZY_LOADER_JS}
+</script>
+"""
+
+    def render_react(self, filename, sources, poster=None):
+        """Composant React (hooks) avec lecture différée"""
+        component = re.sub(r'\W', '', Path(filename).stem.title()) or 'Video'
+        if component[0].isdigit():
+            component = 'Video' + component
+        sources_json = json.dumps([{'src': s['url'], 'type': s['type'],
+                                    'media': s['media']}
+                                   for s in sources], indent=2)
+        poster_json = json.dumps(poster)
+        return f"""// Background vidéo - {filename}
+// Ajouter dans le <head> : {self.head_hints(poster).replace(chr(10), ' ')}
+import {{ useEffect, useRef }} from "react";
+
+const SOURCES = {sources_json};
+const POSTER = {poster_json};
+
+function pickSource(video) {{
+  return SOURCES.find(
+    (s) => (!s.media || window.matchMedia(s.media).matches) && video.canPlayType(s.type)
+  );
+}}
+
+export default function {component}BackgroundVideo({{
+  className = "video-background",
+}}) {{
+  const ref = useRef(null);
+
+  useEffect(() => {{
+    const video = ref.current;
+    if (!video) return undefined;
+    const start = () => {{
+      if (!video.src) {{
+        const source = pickSource(video);
+        if (!source) return;
+        video.src = source.src;
+      }}
+      video.play().catch(() => {{}});
+    }};
+    if (!("IntersectionObserver" in window)) {{
+      start();
+      return undefined;
+    }}
+    const observer = new IntersectionObserver(
+      ([entry]) => (entry.isIntersecting ? start() : video.pause()),
+      {{ rootMargin: "200px" }}
+    );
+    observer.observe(video);
+    return () => observer.disconnect();
+  }}, []);
+
+  return (
+    <div className={{className}}>
+      <video ref={{ref}} muted loop playsInline preload="none"
+        poster={{POSTER || undefined}}
+        style={{{{ width: "100%", height: "100%", objectFit: "cover" }}}} />
+    </div>
+  );
+}}
+"""
+
+    def render_web_component(self, filename, sources, poster=None):
+        """Web component <lazy-video> réutilisable"""
+        poster_attr = f' poster="{html.escape(poster)}"' if poster else ''
+        sources_html = self.render_sources(sources, indent='  ')
+        return f"""// Background vidéo - {filename}
+// Usage :
+// <lazy-video class="video-background"{poster_attr}>
+{chr(10).join('// ' + line for line in sources_html.splitlines())}
+// </lazy-video>
+class LazyVideo extends HTMLElement {{
+  connectedCallback() {{
+    const video = document.createElement("video");
+    video.muted = video.loop = video.playsInline = true;
+    video.preload = "none";
+    video.style.cssText = "width:100%;height:100%;object-fit:cover";
+    if (this.hasAttribute("poster")) video.poster = this.getAttribute("poster");
+    this.appendChild(video);
+    this.video = video;
+    if (!("IntersectionObserver" in window)) return this.start();
+    this.observer = new IntersectionObserver(
+      ([entry]) => (entry.isIntersecting ? this.start() : video.pause()),
+      {{ rootMargin: "200px" }}
+    );
+    this.observer.observe(this);
+  }}
+
+  disconnectedCallback() {{
+    if (this.observer) this.observer.disconnect();
+  }}
+
+  start() {{
+    const video = this.video;
+    if (!video.src) {{
+      // Sources lues au démarrage : script chargé avant le balisage, les enfants
+      // <source> ne sont pas encore parsés lors de connectedCallback
+      const sources = Array.from(this.querySelectorAll("source[data-src]"));
+      if (!sources.length && document.readyState === "loading") {{
+        document.addEventListener("DOMContentLoaded", () => this.start(), {{
+          once: true,
+        }});
+        return;
+      }}
+      const source = sources.find((s) => {{
+        const media = s.getAttribute("media");
+        return (!media || window.matchMedia(media).matches) &&
+          video.canPlayType(s.type);
+      }});
+      if (!source) return;
+      video.src = source.dataset.src;
+    }}
+    video.play().catch(() => {{}});
+  }}
+}}
+
+if (!customElements.get("lazy-video")) customElements.define("lazy-video", LazyVideo);
+"""
+
+    def generate(self, filename, videos=None, posters=(), metadata=None):
+        """Génère tous les templates pour une vidéo
+
+        Retourne un dict {'html', 'react', 'webcomponent'}.
+        """
+        sources, poster = self.collect(filename, videos or [filename], posters,
+                                       metadata)
+        return {
+            'html': self.render_html(filename, sources, poster),
+            'react': self.render_react(filename, sources, poster),
+            'webcomponent': self.render_web_component(filename, sources, poster),
+        }
+
+
+SNIPPET_EXTENSIONS = {
+    'html': '.html',
+    'react': '.jsx',
+    'webcomponent': '.component.js',
+}
+
+
+def save_snippets(filename, snippets, output_dir='html_snippets'):
+    """Sauvegarde les snippets générés, retourne la liste des chemins"""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    paths = []
+    for kind, content in snippets.items():
+        path = Path(output_dir) / f"{filename}{SNIPPET_EXTENSIONS[kind]}"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        paths.append(str(path))
+    return paths
@@ -0,0 +1,93 @@
+// Calcul du SHA-1 au format blob git ("blob <taille>\0" + contenu) hors du thread principal.
+// Implémentation incrémentale : le fichier est lu par tranches, sans être chargé en entier,
+// et fonctionne aussi hors contexte sécurisé (crypto.subtle indisponible en HTTP sur le réseau local).
+
+const SLICE_SIZE = 4 * 1024 * 1024;
+
+class Sha1 {
+    constructor() {
+        this.h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0];
+        this.block = new Uint8Array(64);
+        this.blockLength = 0;
+        this.length = 0;
+        this.w = new Int32Array(80);
+    }
+
+    update(bytes) {
+        this.length += bytes.length;
+        let offset = 0;
+        if (this.blockLength) {
+            const take = Math.min(64 - this.blockLength, bytes.length);
+            this.block.set(bytes.subarray(0, take), this.blockLength);
+            this.blockLength += take;
+            offset = take;
+            if (this.blockLength < 64) return;
+            this.process(this.block, 0);
+            this.blockLength = 0;
+        }
+        for (; offset + 64 <= bytes.length; offset += 64) {
+            this.process(bytes, offset);
+        }
+        this.block.set(bytes.subarray(offset), 0);
+        this.blockLength = bytes.length - offset;
+    }
+
+    process(bytes, offset) {
+        const w = this.w;
+        for (let i = 0; i < 16; i++) {
+            const j = offset + i * 4;
+            w[i] = (bytes[j] << 24) | (bytes[j + 1] << 16) | (bytes[j + 2] << 8) | bytes[j + 3];
+        }
+        for (let i = 16; i < 80; i++) {
+            const x = w[i - 3] ^ w[i - 8] ^ w[i - 14] ^ w[i - 16];
+            w[i] = (x << 1) | (x >>> 31);
+        }
+        let [a, b, c, d, e] = this.h;
+        for (let i = 0; i < 80; i++) {
+            let f, k;
+            if (i < 20) { f = (b & c) | (~b & d); k = 0x5A827999; }
+            else if (i < 40) { f = b ^ c ^ d; k = 0x6ED9EBA1; }
+            else if (i < 60) { f = (b & c) | (b & d) | (c & d); k = 0x8F1BBCDC; }
+            else { f = b ^ c ^ d; k = 0xCA62C1D6; }
+            const t = (((a << 5) | (a >>> 27)) + f + e + k + w[i]) | 0;
+            e = d;
+            d = c;
+            c = (b << 30) | (b >>> 2);
+            b = a;
+            a = t;
+        }
+        this.h[0] = (this.h[0] + a) | 0;
+        this.h[1] = (this.h[1] + b) | 0;
+        this.h[2] = (this.h[2] + c) | 0;
+        this.h[3] = (this.h[3] + d) | 0;
+        this.h[4] = (this.h[4] + e) | 0;
+    }
+
+    hex() {
+        // Remplissage : 0x80, zéros, puis la longueur en bits sur 64 bits
+        const bits = this.length * 8;
+        const padding = new Uint8Array(((this.blockLength < 56 ? 56 : 120) - this.blockLength) + 8);
+        padding[0] = 0x80;
+        const view = new DataView(padding.buffer);
+        view.setUint32(padding.length - 8, Math.floor(bits / 0x100000000));
+        view.setUint32(padding.length - 4, bits >>> 0);
+        this.update(padding);
+        return this.h.map(x => (x >>> 0).toString(16).padStart(8, '0')).join('');
+    }
+}
+
+self.onmessage = async (event) => {
+    const { id, file } = event.data;
+    try {
+        const sha = new Sha1();
+        sha.update(new TextEncoder().encode(`blob ${file.size}\0`));
+        for (let offset = 0; offset < file.size; offset += SLICE_SIZE) {
+            const slice = file.slice(offset, offset + SLICE_SIZE);
+            sha.update(new Uint8Array(await slice.arrayBuffer()));
+            self.postMessage({ id, progress: Math.min(1, (offset + SLICE_SIZE) / file.size) });
+        }
+        self.postMessage({ id, sha: sha.hex() });
+    } catch (error) {
+        self.postMessage({ id, error: error.message });
+    }
+};
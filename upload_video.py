@@ -6,13 +6,88 @@ Upload rapidement des vidéos sur GitHub et génère les URLs jsDelivr
 
 import os
 import sys
+import time
 import base64
+import random
+import argparse
 import requests
 import hashlib
+import shutil
+import tempfile
 from pathlib import Path
 from datetime import datetime
 import pyperclip
 from config import Config
+from snippet_generator import SnippetGenerator, save_snippets
+from mp4_faststart import FASTSTART_EXTENSIONS, Mp4Error, faststart
+from video_probe import ProbeError, format_probe, probe, probe_warnings
+from catalog import VideoCatalog
+from video_layout import VideoLayout
+from batch_journal import DEFAULT_UPLOAD_JOURNAL, BatchJournal
+from fingerprint import FingerprintIndex, extract_frame_hashes
+from optimize_video import (add_optimize_arguments, optimize as optimize_to_budget,
+                            optimize_options)
+from mirror_pull import file_blob_sha
+
+# Délai de base entre deux essais après un conflit (doublé à chaque essai)
+RETRY_BASE_DELAY = 0.5
+
+
+def retry_delay(attempt):
+    """Attente exponentielle avec gigue : les uploads parallèles ne se recroisent pas"""
+    return RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+# Métadonnées issues du probe conservées dans le catalogue
+CATALOG_METADATA_KEYS = ('container', 'duration', 'width', 'height', 'video_codec',
+                         'audio_codec', 'codecs', 'bitrate', 'has_audio', 'source_sha')
+
+
+def commit_tree(session, config, tree_entries, message, branch='main', retries=3):
+    """Crée un commit appliquant des entrées d'arbre (API Git Data) sur une branche
+
+    Une entrée avec 'sha': None supprime le chemin. Le commit est rejoué si
+    la branche avance entre-temps. Retourne le SHA du commit.
+    """
+    api = f"{config.github_api_url}/repos/{config.github_username}/{config.github_repo}"
+
+    for attempt in range(retries):
+        response = session.get(f"{api}/git/ref/heads/{branch}")
+        if response.status_code != 200:
+            raise RuntimeError(f"Branche {branch} introuvable: {response.status_code}")
+        head_sha = response.json()['object']['sha']
+
+        response = session.get(f"{api}/git/commits/{head_sha}")
+        response.raise_for_status()
+        base_tree = response.json()['tree']['sha']
+
+        response = session.post(f"{api}/git/trees",
+                                json={'base_tree': base_tree, 'tree': tree_entries})
+        if response.status_code != 201:
+            raise RuntimeError("Création de l'arbre impossible: "
+                               f"{response.status_code}")
+        tree_sha = response.json()['sha']
+
+        response = session.post(f"{api}/git/commits", json={
+            'message': message,
+            'tree': tree_sha,
+            'parents': [head_sha],
+        })
+        if response.status_code != 201:
+            raise RuntimeError(f"Création du commit impossible: {response.status_code}")
+        commit_sha = response.json()['sha']
+
+        response = session.patch(f"{api}/git/refs/heads/{branch}",
+                                 json={'sha': commit_sha, 'force': False})
+        if response.status_code == 200:
+            return commit_sha
+        if response.status_code != 422:
+            raise RuntimeError(f"Mise à jour de {branch} impossible: "
+                               f"{response.status_code}")
+        # 422 : la branche a avancé, rejouer sur le nouveau HEAD
+        time.sleep(retry_delay(attempt))
+
+    raise RuntimeError(f"{branch} modifiée en continu, commit abandonné")
 
 class VideoUploader:
     def __init__(self):
@@ -22,9 +97,14 @@ class VideoUploader:
             'Authorization': f'token {self.config.github_token}',
             'User-Agent': 'GitHub-jsDelivr-Video-Uploader'
         })
+        self.layout = VideoLayout(self.config.video_layout)
+        self.metadata = None
+        self.duplicates = []
+        self.filename = None
+        self.optimization = None
 
     def validate_video(self, video_path):
-        """Valide la vidéo (taille, format)"""
+        """Valide la vidéo (taille, format, contenu du conteneur)"""
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"❌ Fichier non trouvé: {video_path}")
         
@@ -38,9 +118,51 @@ class VideoUploader:
         if Path(video_path).suffix.lower() not in valid_extensions:
             raise ValueError(f"❌ Format non supporté. Formats autorisés: {', '.join(valid_extensions)}")
         
-        print(f"✅ Vidéo validée: {size_mb:.1f}MB")
+        # Analyser les en-têtes du conteneur (rejette les fichiers non vidéo)
+        try:
+            self.metadata = probe(video_path)
+        except ProbeError as e:
+            raise ValueError(f"❌ Contenu vidéo invalide: {e}")
+
+        print(f"✅ Vidéo validée: {size_mb:.1f}MB • {format_probe(self.metadata)}")
+        for warning in probe_warnings(self.metadata):
+            print(f"⚠️ {warning}")
         return True
 
+    def check_duplicates(self, video_path):
+        """Cherche des quasi-doublons dans l'index d'empreintes
+
+        Retourne (hashes, doublons) ; hashes vaut None si l'empreinte n'a pas
+        pu être calculée (ffmpeg absent...).
+        """
+        try:
+            hashes = extract_frame_hashes(video_path)
+        except RuntimeError as e:
+            print(f"⚠️ Détection de doublons ignorée: {e}")
+            return None, []
+        return hashes, FingerprintIndex().find_similar(hashes)
+
+    def prepare_upload(self, video_path, source_path=None):
+        """Étapes locales communes avant un upload (clients synchrone et asyncio)
+
+        Valide la vidéo, note le SHA git du fichier d'origine (`source_path`,
+        avant optimisation) et cherche les quasi-doublons, rangés dans
+        self.duplicates. Retourne les empreintes (ou None).
+        """
+        self.validate_video(video_path)
+        # SHA git du fichier d'origine : un nouveau dépôt du même fichier est reconnu
+        self.metadata['source_sha'] = file_blob_sha(source_path or video_path)
+        hashes, self.duplicates = self.check_duplicates(video_path)
+        return hashes
+
+    def finish_upload(self, filename, hashes):
+        """Catalogue et index d'empreintes après un upload réussi"""
+        self.record_metadata(filename)
+        if hashes:
+            index = FingerprintIndex()
+            with index.edit():
+                index.add(filename, hashes)
+
     def generate_filename(self, original_path):
         """Génère un nom de fichier unique"""
         original_name = Path(original_path).stem
@@ -53,6 +175,36 @@ class VideoUploader:
         
         return f"{original_name}_{timestamp}_{file_hash}{extension}"
 
+    def prepare_faststart(self, video_path):
+        """Place l'atome moov en tête des MP4/MOV avant l'upload
+
+        Retourne le chemin à uploader : une copie temporaire réécrite si le
+        moov a été déplacé, sinon le fichier d'origine (jamais modifié).
+        """
+        if Path(video_path).suffix.lower() not in FASTSTART_EXTENSIONS:
+            return video_path
+
+        fd, output_path = tempfile.mkstemp(suffix=Path(video_path).suffix.lower())
+        os.close(fd)
+        try:
+            report = faststart(video_path, output_path)
+        except Mp4Error as e:
+            os.remove(output_path)
+            print(f"⚠️ Faststart ignoré: {e}")
+            return video_path
+
+        if not report['moved']:
+            os.remove(output_path)
+            print(f"⚡ Faststart: {report['reason']}")
+            return video_path
+
+        converted = (f", {report['converted']} stco converti(s) en co64"
+                     if report['converted'] else "")
+        print(f"⚡ Faststart: moov ({report['moov_size']} octets) déplacé en tête, "
+              f"{report['entries']} offsets corrigés dans {report['tables']} table(s)"
+              + converted)
+        return output_path
+
     def upload_to_github(self, video_path, filename):
         """Upload la vidéo vers GitHub"""
         print(f"📤 Upload vers GitHub...")
@@ -62,7 +214,8 @@ class VideoUploader:
             content = base64.b64encode(f.read()).decode('utf-8')
         
         # Préparer la requête
-        url = f"https://api.github.com/repos/{self.config.github_username}/{self.config.github_repo}/contents/videos/{filename}"
+        url = (f"{self.config.github_api_url}/repos/{self.config.github_username}/"
+               f"{self.config.github_repo}/contents/{self.layout.path(filename)}")
         
         data = {
             'message': f"Add video: {filename}",
@@ -79,8 +232,13 @@ class VideoUploader:
         except:
             pass
         
-        # Upload
-        response = self.session.put(url, json=data)
+        # Upload (409 : un autre upload a fait avancer la branche, réessayer)
+        for attempt in range(4):
+            response = self.session.put(url, json=data)
+            if response.status_code != 409 or attempt == 3:
+                break
+            print("🔁 Branche modifiée pendant l'upload, nouvel essai...")
+            time.sleep(retry_delay(attempt))
         
         if response.status_code in [200, 201]:
             print("✅ Upload réussi!")
@@ -90,56 +248,258 @@ class VideoUploader:
             print(response.text)
             return False
 
+    def create_blob(self, video_path):
+        """Crée un blob git pour une vidéo, retourne son SHA"""
+        with open(video_path, 'rb') as f:
+            content = base64.b64encode(f.read()).decode('utf-8')
+
+        url = (f"{self.config.github_api_url}/repos/{self.config.github_username}/"
+               f"{self.config.github_repo}/git/blobs")
+        response = self.session.post(url, json={'content': content,
+                                                'encoding': 'base64'})
+        if response.status_code != 201:
+            raise RuntimeError(f"Création du blob impossible: {response.status_code}")
+        return response.json()['sha']
+
+    def commit_blobs(self, entries, message, branch='main', retries=3):
+        """Crée un commit ajoutant des blobs existants au dossier des vidéos
+
+        `entries` est une liste de (nom de fichier, SHA du blob), placés selon
+        l'organisation configurée. Retourne le SHA du commit.
+        """
+        tree_entries = [
+            {'path': self.layout.path(filename), 'mode': '100644', 'type': 'blob',
+             'sha': sha}
+            for filename, sha in entries
+        ]
+        return commit_tree(self.session, self.config, tree_entries, message, branch,
+                           retries)
+
+    def remote_blob_sha(self, filename):
+        """SHA du blob actuellement commité pour une vidéo (None si absente)"""
+        url = (f"{self.config.github_api_url}/repos/{self.config.github_username}/"
+               f"{self.config.github_repo}/contents/{self.layout.path(filename)}")
+        response = self.session.get(url)
+        return response.json()['sha'] if response.status_code == 200 else None
+
+    def upload_batch_to_github(self, files, message=None, journal=None):
+        """Upload plusieurs vidéos en un seul commit (API Git Data)
+
+        `files` est une liste de (chemin local, nom de fichier). Avec un
+        journal (BatchJournal, clé = nom de fichier), les blobs déjà créés et
+        les vidéos déjà commitées lors d'un run interrompu sont réutilisés.
+        Retourne le SHA du commit (None si tout était déjà commité).
+        """
+        print(f"📤 Upload de {len(files)} vidéo(s) en un commit...")
+        entries = []
+        for path, filename in files:
+            blob = journal.step(filename, 'blob') if journal else None
+            if blob is None:
+                if journal:
+                    journal.begin(filename, 'blob')
+                blob = {'sha': self.create_blob(path)}
+                if journal:
+                    journal.record(filename, 'blob', **blob)
+            elif self.remote_blob_sha(filename) == blob['sha']:
+                # Commit effectué juste avant l'interruption
+                print(f"⏭️ {filename} déjà commité")
+                journal.record(filename, 'committed', commit=None)
+                continue
+            else:
+                print(f"♻️ Blob de {filename} déjà créé, réutilisé")
+            entries.append((filename, blob['sha']))
+
+        if not entries:
+            return None
+        if message is None:
+            message = f"Add {len(entries)} videos"
+            if len(entries) <= 5:
+                message += ": " + ", ".join(filename for filename, _ in entries)
+        if journal:
+            for filename, _ in entries:
+                journal.begin(filename, 'committed')
+        commit_sha = self.commit_blobs(entries, message)
+        if journal:
+            for filename, _ in entries:
+                journal.record(filename, 'committed', commit=commit_sha)
+        print(f"✅ Commit {commit_sha[:8]} créé")
+        return commit_sha
+
+    def upload_batch(self, video_paths, journal_path=None, allow_duplicates=False):
+        """Upload un lot de vidéos en un commit, avec reprise après interruption
+
+        Chaque étape (hash, blob, commit, snippet) est journalisée : relancer
+        la même commande ne refait que ce qui manque. Sans `journal_path`, le
+        journal par défaut est vidé du lot une fois celui-ci terminé sans
+        erreur ; un journal explicite garde tout. Retourne le journal.
+        """
+        journal = BatchJournal(journal_path or DEFAULT_UPLOAD_JOURNAL)
+        print(f"🎥 Upload d'un lot de {len(video_paths)} vidéo(s) "
+              f"(journal: {journal.path})")
+        print("=" * 40)
+
+        items = []
+        for video_path in video_paths:
+            source = str(Path(video_path).resolve())
+            try:
+                stat = os.stat(video_path)
+            except FileNotFoundError:
+                print(f"❌ Fichier non trouvé: {video_path}")
+                continue
+            identity = {'source': source, 'size': stat.st_size, 'mtime': stat.st_mtime}
+            filename = journal.find(**identity)
+            if filename and journal.step(filename, 'snippet'):
+                print(f"✅ {Path(video_path).name}: déjà terminé ({filename})")
+                continue
+
+            try:
+                is_new = filename is None
+                if is_new:
+                    filename = self.generate_filename(video_path)
+                    journal.record(filename, 'hashed', **identity)
+                print(f"\n📁 {Path(video_path).name} → {filename}"
+                      + ("" if is_new else " (reprise)"))
+                self.validate_video(video_path)
+                self.metadata['source_sha'] = file_blob_sha(video_path)
+                item = {'path': video_path, 'filename': filename,
+                        'metadata': self.metadata, 'upload_path': video_path,
+                        'hashes': None}
+                if not journal.step(filename, 'blob'):
+                    item['hashes'], duplicates = self.check_duplicates(video_path)
+                    if duplicates and not allow_duplicates:
+                        raise ValueError(f"❌ Quasi-doublon de {duplicates[0]['name']} "
+                                         "(--force pour uploader)")
+                    item['upload_path'] = self.prepare_faststart(video_path)
+                items.append(item)
+            except (ValueError, FileNotFoundError) as e:
+                print(f"{e} ({Path(video_path).name})")
+                journal.fail(filename, e)
+            except Exception as e:
+                print(f"❌ {Path(video_path).name}: {e}")
+                journal.fail(filename, e)
+
+        pending = [item for item in items
+                   if not journal.step(item['filename'], 'committed')]
+        try:
+            if pending:
+                self.upload_batch_to_github([(item['upload_path'], item['filename'])
+                                             for item in pending], journal=journal)
+        except Exception as e:
+            print(f"❌ Erreur lors du commit: {e}")
+            for item in pending:
+                journal.fail(item['filename'], e)
+        finally:
+            for item in items:
+                if item['upload_path'] != item['path']:
+                    os.remove(item['upload_path'])
+
+        for item in items:
+            filename = item['filename']
+            if not journal.step(filename, 'committed'):
+                continue
+            try:
+                self.metadata = item['metadata']
+                hashes = item['hashes'] or self.check_duplicates(item['path'])[0]
+                self.finish_upload(filename, hashes)
+                paths = save_snippets(filename, self.generate_snippets(filename))
+                journal.record(filename, 'snippet', paths=[str(path) for path in paths])
+                print(f"🔗 {filename}: {self.generate_jsdelivr_url(filename)}")
+            except Exception as e:
+                print(f"❌ {filename}: {e}")
+                journal.fail(filename, e)
+
+        print("\n" + journal.format_report(journal.batch_keys))
+        summary = journal.summary(journal.batch_keys)
+        if journal_path is None and not summary['failed'] and not summary['in_flight']:
+            journal.forget(journal.batch_keys)
+        return journal
+
     def generate_jsdelivr_url(self, filename):
         """Génère l'URL jsDelivr"""
-        return f"https://cdn.jsdelivr.net/gh/{self.config.github_username}/{self.config.github_repo}@main/videos/{filename}"
+        return self.layout.cdn_url(self.config.jsdelivr_base_url,
+                                   self.config.github_username,
+                                   self.config.github_repo, filename)
 
-    def generate_html_snippet(self, jsdelivr_url, filename):
+    def generate_snippets(self, filename, videos=None, posters=()):
+        """Génère les snippets d'intégration (HTML, React, web component)"""
+        generator = SnippetGenerator(self.config.github_username,
+                                     self.config.github_repo, layout=self.layout,
+                                     base_url=self.config.jsdelivr_base_url)
+        metadata = {filename: self.metadata} if self.metadata else None
+        return generator.generate(filename, videos, posters, metadata)
+
+    def record_metadata(self, filename):
+        """Enregistre les métadonnées de la vidéo dans le catalogue local"""
+        if not self.metadata:
+            return
+        catalog = VideoCatalog()
+        with catalog.edit():
+            catalog.update(filename, **{key: self.metadata.get(key)
+                                        for key in CATALOG_METADATA_KEYS})
+
+    def generate_html_snippet(self, filename):
         """Génère un snippet HTML d'exemple"""
-        return f"""
-<!-- Background vidéo - {filename} -->
-<div class="video-background">
-    <video autoplay muted loop playsinline>
-        <source src="{jsdelivr_url}" type="video/mp4">
-        Votre navigateur ne supporte pas les vidéos HTML5.
-    </video>
-</div>
-
-<style>
-.video-background {{
-    position: fixed;
-    top: 0;
-    left: 0;
-    width: 100%;
-    height: 100%;
-    z-index: -1;
-    overflow: hidden;
-}}
-
-.video-background video {{
-    width: 100%;
-    height: 100%;
-    object-fit: cover;
-}}
-</style>"""
-
-    def upload(self, video_path):
-        """Méthode principale d'upload"""
+        return self.generate_snippets(filename)['html']
+
+    def optimize_video(self, video_path, **options):
+        """Réencode la vidéo pour tenir dans un budget, retourne le chemin à uploader"""
+        try:
+            self.optimization = optimize_to_budget(video_path, **options)
+        except ProbeError as e:
+            raise ValueError(f"❌ Contenu vidéo invalide: {e}")
+        return self.optimization['path']
+
+    def upload(self, video_path, allow_duplicates=False, optimize=None,
+               on_uploaded=None):
+        """Méthode principale d'upload
+
+        `optimize` (dict d'options de VideoOptimizer) active le réencodage
+        avant validation : un fichier trop volumineux peut alors être accepté.
+        `on_uploaded(chemin, nom)` reçoit le fichier exactement tel qu'uploadé,
+        avant la suppression des copies temporaires.
+        """
+        source_path = video_path
+        self.optimization = None
         try:
             print("🎥 GitHub + jsDelivr Video Uploader")
             print("=" * 40)
             
-            # Valider la vidéo
-            self.validate_video(video_path)
-            
+            # Réencoder pour tenir dans le budget
+            if optimize is not None:
+                video_path = self.optimize_video(video_path, **optimize)
+
+            # Valider la vidéo et détecter les quasi-doublons déjà uploadés
+            hashes = self.prepare_upload(video_path, source_path)
+            for match in self.duplicates:
+                print(f"♊ Quasi-doublon de {match['name']} "
+                      f"(distance {match['distance']})")
+            if self.duplicates and not allow_duplicates:
+                print("❌ Upload annulé (utilisez --force pour uploader quand même)")
+                return False
+
             # Générer le nom de fichier
-            filename = self.generate_filename(video_path)
+            filename = self.filename = self.generate_filename(video_path)
             print(f"📁 Nom du fichier: {filename}")
             
-            # Upload vers GitHub
-            if not self.upload_to_github(video_path, filename):
-                return False
+            # Faststart puis upload vers GitHub
+            upload_path = self.prepare_faststart(video_path)
+            try:
+                if not self.upload_to_github(upload_path, filename):
+                    return False
+                if on_uploaded:
+                    # La vidéo est déjà commitée : un échec local ne doit pas
+                    # faire échouer l'upload
+                    try:
+                        on_uploaded(upload_path, filename)
+                    except Exception as e:
+                        print(f"⚠️ Traitement après upload impossible: {e}")
+            finally:
+                if upload_path != video_path:
+                    os.remove(upload_path)
             
+            # Enregistrer les métadonnées et l'empreinte
+            self.finish_upload(filename, hashes)
+
             # Générer l'URL jsDelivr
             jsdelivr_url = self.generate_jsdelivr_url(filename)
             
@@ -151,16 +511,11 @@ class VideoUploader:
             print(f"🔗 URL jsDelivr: {jsdelivr_url}")
             print("📋 URL copiée dans le presse-papier!")
             
-            # Générer snippet HTML
-            html_snippet = self.generate_html_snippet(jsdelivr_url, filename)
+            # Générer et sauvegarder les snippets (HTML, React, web component)
+            snippet_paths = save_snippets(filename, self.generate_snippets(filename))
             
-            # Sauvegarder le snippet
-            snippet_path = f"html_snippets/{filename}.html"
-            os.makedirs("html_snippets", exist_ok=True)
-            with open(snippet_path, 'w', encoding='utf-8') as f:
-                f.write(html_snippet)
-            
-            print(f"📄 Snippet HTML sauvé: {snippet_path}")
+            for snippet_path in snippet_paths:
+                print(f"📄 Snippet sauvé: {snippet_path}")
             print("\n⏰ Note: Il peut falloir quelques minutes pour que jsDelivr mette à jour son cache.")
             
             return True
@@ -168,17 +523,50 @@ class VideoUploader:
         except Exception as e:
             print(f"❌ Erreur: {e}")
             return False
+        finally:
+            # Dossier temporaire créé par l'optimiseur (encodage retenu compris)
+            if self.optimization and self.optimization['work_dir']:
+                shutil.rmtree(self.optimization['work_dir'], ignore_errors=True)
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python upload_video.py <chemin_vers_video>")
-        print("Exemple: python upload_video.py ./ma_video.mp4")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Upload une vidéo sur GitHub et génère l'URL jsDelivr",
+        epilog="Exemple: python upload_video.py ./ma_video.mp4 "
+               "--optimize --target-mb 8")
+    parser.add_argument('videos', nargs='*', metavar='video',
+                        help="chemin(s) vers la ou les vidéos")
+    parser.add_argument('--force', action='store_true',
+                        help="uploader même en cas de quasi-doublon")
+    parser.add_argument('--optimize', action='store_true',
+                        help="réencoder pour réduire la taille avant l'upload")
+    parser.add_argument('--journal',
+                        help="journal de reprise d'un lot "
+                             "(défaut: upload_journal.jsonl)")
+    parser.add_argument('--status', action='store_true',
+                        help="afficher l'état du journal et quitter")
+    add_optimize_arguments(parser)
+    args = parser.parse_args()
     
-    video_path = sys.argv[1]
+    if args.status:
+        print(BatchJournal(args.journal or DEFAULT_UPLOAD_JOURNAL).format_report())
+        sys.exit(0)
+    if not args.videos:
+        parser.error("au moins une vidéo est requise")
+
     uploader = VideoUploader()
     
-    success = uploader.upload(video_path)
+    # Plusieurs fichiers (ou --journal) : un commit, avec reprise
+    if len(args.videos) > 1 or args.journal:
+        if args.optimize:
+            parser.error("--optimize ne s'applique qu'à un seul fichier")
+        journal = uploader.upload_batch(args.videos, args.journal,
+                                        allow_duplicates=args.force)
+        summary = journal.summary(journal.batch_keys)
+        sys.exit(0 if not summary['failed'] and not summary['in_flight'] else 1)
+
+    optimize = optimize_options(args) if args.optimize else None
+    success = uploader.upload(args.videos[0], allow_duplicates=args.force,
+                              optimize=optimize)
     sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+"""
+Organisation des vidéos dans le repository
+Résolveur unique des chemins : à plat (videos/<nom>) ou réparti par préfixe du
+hash de contenu (videos/ab/cd/<nom>) pour garder des dossiers petits
+"""
+
+import hashlib
+import posixpath
+from pathlib import Path
+from config import DEFAULT_CONFIG
+
+LAYOUTS = ('flat', 'sharded')
+
+# Deux niveaux de deux caractères hexadécimaux : 65 536 dossiers
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+# Table des anciens chemins → nouveaux chemins, écrite par les migrations
+REDIRECTS_FILE = '_redirects.json'
+
+
+def content_hash(filename):
+    """Hash de contenu d'une vidéo, lu dans son nom
+
+    generate_filename termine chaque nom par 8 caractères du MD5 du fichier
+    (nom_YYYYmmdd_HHMMSS_<hash>.mp4). Les noms sans hash (ajouts manuels)
+    utilisent le MD5 du nom, stable lui aussi.
+    """
+    stem = Path(filename).stem
+    suffix = stem.rsplit('_', 1)[-1].lower()
+    if len(suffix) == 8 and all(c in '0123456789abcdef' for c in suffix):
+        return suffix
+    return hashlib.md5(Path(filename).name.encode('utf-8')).hexdigest()
+
+
+class VideoLayout:
+    def __init__(self, kind=None, folder=None):
+        self.kind = kind or DEFAULT_CONFIG['video_layout']
+        if self.kind not in LAYOUTS:
+            raise ValueError(f"❌ Organisation inconnue: {self.kind} "
+                             f"(choix: {', '.join(LAYOUTS)})")
+        self.folder = folder or DEFAULT_CONFIG['video_folder']
+
+    @property
+    def redirects_path(self):
+        return f"{self.folder}/{REDIRECTS_FILE}"
+
+    def shard(self, filename):
+        """Sous-dossier d'une vidéo ('' pour l'organisation à plat)"""
+        if self.kind == 'flat':
+            return ''
+        digest = content_hash(filename)
+        return '/'.join(digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH]
+                        for i in range(SHARD_DEPTH))
+
+    def path(self, filename):
+        """Chemin d'une vidéo dans le repository"""
+        name = Path(filename).name
+        shard = self.shard(name)
+        return f"{self.folder}/{shard}/{name}" if shard else f"{self.folder}/{name}"
+
+    def is_video_path(self, path):
+        """Vrai pour un fichier vidéo du dossier des vidéos (toutes organisations)"""
+        return (path.startswith(self.folder + '/')
+                and Path(path).suffix.lower() in DEFAULT_CONFIG['supported_formats'])
+
+    def cdn_url(self, base_url, username, repo, filename, ref=None):
+        """URL jsDelivr d'une vidéo"""
+        ref = ref or DEFAULT_CONFIG['github_branch']
+        return f"{base_url.rstrip('/')}/{username}/{repo}@{ref}/{self.path(filename)}"
+
+
+def resolve_redirect(path, redirects, max_hops=10):
+    """Chemin actuel d'un ancien chemin, en suivant les migrations successives"""
+    path = posixpath.normpath(path.lstrip('/'))
+    for _ in range(max_hops):
+        if path not in redirects:
+            break
+        path = redirects[path]
+    return path
@@ -0,0 +1,407 @@
+"""
+Analyse rapide des conteneurs vidéo (sans ffmpeg)
+Lit uniquement les en-têtes MP4/MOV, WebM/Matroska et AVI via mmap
+"""
+
+import os
+import mmap
+import struct
+from mp4_faststart import Mp4Error, iter_boxes
+
+# Pistes MP4 : hdlr -> type de piste
+MP4_HANDLERS = {b'vide': 'video', b'soun': 'audio'}
+
+# Codecs WebM/Matroska exprimables dans un attribut type="...; codecs=..."
+MATROSKA_CODECS = {
+    'V_VP8': 'vp8',
+    'V_VP9': 'vp9',
+    'A_OPUS': 'opus',
+    'A_VORBIS': 'vorbis',
+}
+
+# Éléments EBML utilisés
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+
+# Seuils des avertissements pour une vidéo de fond
+MAX_BACKGROUND_BITRATE = 5_000_000
+MAX_BACKGROUND_HEIGHT = 1080
+
+
+class ProbeError(ValueError):
+    """Le fichier n'est pas une vidéo reconnue"""
+
+
+def probe(path):
+    """Analyse un fichier vidéo et retourne ses métadonnées
+
+    Retourne un dict {'container', 'duration', 'width', 'height',
+    'video_codec', 'audio_codec', 'codecs', 'bitrate', 'has_audio', 'size'}.
+    `codecs` contient les chaînes RFC 6381 utilisables dans un attribut type
+    (None si l'une d'elles est inconnue). Lève ProbeError si le contenu n'est
+    pas une vidéo.
+    """
+    size = os.path.getsize(path)
+    if size < 12:
+        raise ProbeError("Fichier trop petit pour être une vidéo")
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+                try:
+                    info = _probe_mp4(mm, size)
+                except (Mp4Error, struct.error) as e:
+                    raise ProbeError(f"MP4 invalide: {e}")
+            elif struct.unpack_from('>I', mm, 0)[0] == EBML_HEADER:
+                info = _probe_matroska(mm, size)
+            elif mm[0:4] == b'RIFF' and mm[8:12] == b'AVI ':
+                info = _probe_avi(mm, size)
+            else:
+                raise ProbeError("Conteneur vidéo non reconnu")
+
+    if not info.get('width') or not info.get('video_codec'):
+        raise ProbeError("Aucune piste vidéo trouvée")
+
+    info['size'] = size
+    info['has_audio'] = bool(info.get('audio_codec'))
+    duration = info.get('duration') or 0
+    info['bitrate'] = int(size * 8 / duration) if duration > 0 else None
+    return info
+
+
+def probe_warnings(info, muted=True):
+    """Avertissements pertinents pour une vidéo de fond"""
+    warnings = []
+    if muted and info.get('has_audio'):
+        warnings.append(f"piste audio ({info['audio_codec']}) "
+                        "inutile pour une vidéo muette")
+    if info.get('bitrate') and info['bitrate'] > MAX_BACKGROUND_BITRATE:
+        warnings.append(f"débit élevé ({info['bitrate'] / 1_000_000:.1f} Mbit/s) "
+                        "pour une vidéo de fond")
+    if info.get('height') and info['height'] > MAX_BACKGROUND_HEIGHT:
+        warnings.append(f"résolution {info['width']}x{info['height']} "
+                        f"supérieure à {MAX_BACKGROUND_HEIGHT}p")
+    if not info.get('duration'):
+        warnings.append("durée inconnue")
+    return warnings
+
+
+def format_probe(info):
+    """Résumé lisible des métadonnées"""
+    parts = [f"{info['container']}", f"{info['width']}x{info['height']}",
+             info['video_codec']]
+    if info.get('duration'):
+        parts.append(f"{info['duration']:.1f}s")
+    if info.get('bitrate'):
+        parts.append(f"{info['bitrate'] / 1000:.0f} kbit/s")
+    if info.get('has_audio'):
+        parts.append(f"audio: {info['audio_codec']}")
+    else:
+        parts.append("sans audio")
+    return " • ".join(parts)
+
+
+# --- MP4 / MOV -------------------------------------------------------------
+
+def _find_box(data, start, end, box_type):
+    for box in iter_boxes(data, start, end):
+        if box.type == box_type:
+            return box
+    return None
+
+
+def _box_path(data, box, *path):
+    """Descend dans une hiérarchie de boîtes, retourne la dernière (ou None)"""
+    for box_type in path:
+        if box is None:
+            return None
+        box = _find_box(data, box.offset + box.header, box.offset + box.size, box_type)
+    return box
+
+
+def _probe_mp4(mm, size):
+    boxes = list(iter_boxes(mm, 0, size))
+    ftyp = next((box for box in boxes if box.type == b'ftyp'), None)
+    moov = next((box for box in boxes if box.type == b'moov'), None)
+    if moov is None:
+        raise ProbeError("Atome moov introuvable")
+
+    brand = bytes(mm[ftyp.offset + 8:ftyp.offset + 12]) if ftyp else b''
+    info = {'container': 'mov' if brand == b'qt  ' else 'mp4', 'codecs': []}
+
+    mvhd = _box_path(mm, moov, b'mvhd')
+    if mvhd:
+        body = mvhd.offset + mvhd.header
+        if mm[body] == 1:
+            timescale, duration = struct.unpack_from('>IQ', mm, body + 20)
+        else:
+            timescale, duration = struct.unpack_from('>II', mm, body + 12)
+        info['duration'] = duration / timescale if timescale else None
+
+    for trak in iter_boxes(mm, moov.offset + moov.header, moov.offset + moov.size):
+        if trak.type != b'trak':
+            continue
+        hdlr = _box_path(mm, trak, b'mdia', b'hdlr')
+        if hdlr is None:
+            continue
+        handler_start = hdlr.offset + hdlr.header + 8
+        kind = MP4_HANDLERS.get(bytes(mm[handler_start:handler_start + 4]))
+        stsd = _box_path(mm, trak, b'mdia', b'minf', b'stbl', b'stsd')
+        if kind is None or stsd is None:
+            continue
+        entries_start = stsd.offset + stsd.header + 8
+        entry = next(iter_boxes(mm, entries_start, stsd.offset + stsd.size), None)
+        if entry is None:
+            continue
+        fourcc = entry.type.decode('latin-1').strip()
+
+        if kind == 'video' and not info.get('video_codec'):
+            info['video_codec'] = fourcc
+            # Largeur/hauteur de l'entrée VisualSampleEntry
+            info['width'], info['height'] = struct.unpack_from(
+                '>HH', mm, entry.offset + entry.header + 24)
+            info['codecs'].append(_mp4_video_codec_string(mm, entry))
+        elif kind == 'audio' and not info.get('audio_codec'):
+            info['audio_codec'] = fourcc
+            info['codecs'].append(_mp4_audio_codec_string(mm, entry))
+
+    if None in info['codecs']:
+        info['codecs'] = None
+    return info
+
+
+def _mp4_video_codec_string(mm, entry):
+    """Chaîne RFC 6381 pour avc1/avc3 (profil et niveau depuis avcC)"""
+    if entry.type not in (b'avc1', b'avc3'):
+        return None
+    # VisualSampleEntry : 8 octets SampleEntry + 70 octets de champs vidéo
+    avcc = _find_box(mm, entry.offset + entry.header + 78, entry.offset + entry.size,
+                     b'avcC')
+    if avcc is None:
+        return None
+    config_start = avcc.offset + avcc.header
+    profile, compat, level = mm[config_start + 1:config_start + 4]
+    return f"{entry.type.decode()}.{profile:02x}{compat:02x}{level:02x}"
+
+
+def _mp4_audio_codec_string(mm, entry):
+    """Chaîne RFC 6381 pour mp4a (type d'objet depuis esds)"""
+    if entry.type == b'Opus':
+        return 'opus'
+    if entry.type != b'mp4a':
+        return None
+    # AudioSampleEntry : 8 octets SampleEntry + 20 octets de champs audio,
+    # plus 16 (v1) ou 36 (v2) octets pour les descriptions QuickTime
+    body = entry.offset + entry.header
+    version, = struct.unpack_from('>H', mm, body + 8)
+    start = body + 28 + {1: 16, 2: 36}.get(version, 0)
+    esds = _find_box(mm, start, entry.offset + entry.size, b'esds')
+    if esds is None:
+        wave = _find_box(mm, start, entry.offset + entry.size, b'wave')
+        esds = _box_path(mm, wave, b'esds')
+    if esds is None:
+        return None
+    data = bytes(mm[esds.offset + esds.header + 4:esds.offset + esds.size])
+    object_type, audio_object_type = _parse_esds(data)
+    if object_type is None:
+        return None
+    if object_type == 0x40 and audio_object_type:
+        return f"mp4a.40.{audio_object_type}"
+    return f"mp4a.{object_type:02x}"
+
+
+def _parse_esds(data):
+    """Extrait objectTypeIndication et le type d'objet audio d'un esds"""
+    def descriptor(offset):
+        tag = data[offset]
+        offset += 1
+        length = 0
+        for _ in range(4):
+            byte = data[offset]
+            offset += 1
+            length = (length << 7) | (byte & 0x7F)
+            if not byte & 0x80:
+                break
+        return tag, offset, length
+
+    try:
+        tag, offset, _ = descriptor(0)
+        if tag != 0x03:
+            return None, None
+        flags = data[offset + 2]
+        offset += 3
+        if flags & 0x80:
+            offset += 2
+        if flags & 0x40:
+            offset += 1 + data[offset]
+        if flags & 0x20:
+            offset += 2
+        tag, offset, _ = descriptor(offset)
+        if tag != 0x04:
+            return None, None
+        object_type = data[offset]
+        offset += 13
+        tag, offset, length = descriptor(offset)
+        audio_object_type = data[offset] >> 3 if tag == 0x05 and length else None
+        return object_type, audio_object_type
+    except IndexError:
+        return None, None
+
+
+# --- WebM / Matroska -------------------------------------------------------
+
+def _read_vint(data, offset, keep_marker):
+    """Lit un entier de taille variable EBML, retourne (valeur, longueur)"""
+    first = data[offset]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ProbeError("Entier EBML invalide")
+    value = first if keep_marker else first & (mask - 1)
+    for byte in data[offset + 1:offset + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def _iter_elements(data, start, end):
+    """Itère sur les éléments EBML, retourne (id, début des données, taille)
+
+    Une taille inconnue (tous les bits à 1) s'étend jusqu'à `end`.
+    """
+    offset = start
+    while offset < end:
+        element_id, id_length = _read_vint(data, offset, keep_marker=True)
+        element_size, size_length = _read_vint(data, offset + id_length,
+                                               keep_marker=False)
+        data_start = offset + id_length + size_length
+        if element_size == (1 << (7 * size_length)) - 1:
+            element_size = end - data_start
+        yield element_id, data_start, min(element_size, end - data_start)
+        offset = data_start + element_size
+
+
+def _read_uint(data, start, size):
+    return int.from_bytes(data[start:start + size], 'big')
+
+
+def _read_string(data, start, size):
+    return bytes(data[start:start + size]).decode('ascii', 'replace').strip('\x00')
+
+
+def _read_float(data, start, size):
+    if size == 4:
+        return struct.unpack_from('>f', data, start)[0]
+    if size == 8:
+        return struct.unpack_from('>d', data, start)[0]
+    return None
+
+
+def _probe_matroska(mm, size):
+    info = {'codecs': []}
+    doc_type = 'matroska'
+    timecode_scale = 1_000_000
+    duration = None
+
+    try:
+        for element_id, start, length in _iter_elements(mm, 0, size):
+            if element_id == EBML_HEADER:
+                for child_id, child_start, child_length in _iter_elements(
+                        mm, start, start + length):
+                    if child_id == EBML_DOCTYPE:
+                        doc_type = _read_string(mm, child_start, child_length)
+            elif element_id == SEGMENT:
+                for child_id, child_start, child_length in _iter_elements(
+                        mm, start, start + length):
+                    if child_id == INFO:
+                        for info_id, info_start, info_length in _iter_elements(
+                                mm, child_start, child_start + child_length):
+                            if info_id == TIMECODE_SCALE:
+                                timecode_scale = _read_uint(mm, info_start, info_length)
+                            elif info_id == DURATION:
+                                duration = _read_float(mm, info_start, info_length)
+                    elif child_id == TRACKS:
+                        _parse_tracks(mm, child_start, child_start + child_length, info)
+                    elif child_id == CLUSTER:
+                        # Les en-têtes précèdent les clusters : on s'arrête là
+                        break
+                break
+    except (IndexError, struct.error):
+        raise ProbeError("En-tête EBML tronqué")
+
+    info['container'] = doc_type
+    info['duration'] = duration * timecode_scale / 1e9 if duration else None
+    if None in info['codecs']:
+        info['codecs'] = None
+    return info
+
+
+def _parse_tracks(mm, start, end, info):
+    for element_id, entry_start, entry_length in _iter_elements(mm, start, end):
+        if element_id != TRACK_ENTRY:
+            continue
+        track = {}
+        for child_id, child_start, child_length in _iter_elements(
+                mm, entry_start, entry_start + entry_length):
+            if child_id == TRACK_TYPE:
+                track['type'] = _read_uint(mm, child_start, child_length)
+            elif child_id == CODEC_ID:
+                track['codec'] = _read_string(mm, child_start, child_length)
+            elif child_id == VIDEO:
+                for video_id, video_start, video_length in _iter_elements(
+                        mm, child_start, child_start + child_length):
+                    if video_id == PIXEL_WIDTH:
+                        track['width'] = _read_uint(mm, video_start, video_length)
+                    elif video_id == PIXEL_HEIGHT:
+                        track['height'] = _read_uint(mm, video_start, video_length)
+
+        if track.get('type') == 1 and not info.get('video_codec'):
+            info['video_codec'] = track.get('codec')
+            info['width'], info['height'] = track.get('width'), track.get('height')
+            info['codecs'].append(MATROSKA_CODECS.get(track.get('codec')))
+        elif track.get('type') == 2 and not info.get('audio_codec'):
+            info['audio_codec'] = track.get('codec')
+            info['codecs'].append(MATROSKA_CODECS.get(track.get('codec')))
+
+
+# --- AVI -------------------------------------------------------------------
+
+def _probe_avi(mm, size):
+    avih = mm.find(b'avih', 12, min(size, 4096))
+    if avih < 0:
+        raise ProbeError("En-tête AVI introuvable")
+    (usec_per_frame, _, _, _, total_frames, _, streams, _,
+     width, height) = struct.unpack_from('<10I', mm, avih + 8)
+
+    info = {'container': 'avi', 'width': width, 'height': height, 'codecs': None,
+            'duration': usec_per_frame * total_frames / 1e6 if usec_per_frame else None}
+
+    # strh : type de flux ('vids'/'auds') suivi du fourcc du codec
+    offset = avih
+    while True:
+        offset = mm.find(b'strh', offset + 4, min(size, 65536))
+        if offset < 0:
+            break
+        stream_type = bytes(mm[offset + 8:offset + 12])
+        handler = bytes(mm[offset + 12:offset + 16])
+        if stream_type == b'vids' and not info.get('video_codec'):
+            info['video_codec'] = handler.decode('latin-1').strip('\x00 ') or 'avi'
+        elif stream_type == b'auds' and not info.get('audio_codec'):
+            info['audio_codec'] = 'pcm/mp3'
+    if streams > 1 and not info.get('audio_codec'):
+        info['audio_codec'] = 'inconnu'
+    return info
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Surveillance d'un dossier d'export
+Upload automatiquement les nouvelles vidéos (inotify sous Linux, sinon polling),
+une fois stabilisées, en regroupant les arrivées rapprochées dans un seul commit
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import select
+import signal
+import ctypes
+import ctypes.util
+import argparse
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from upload_video import VideoUploader
+from snippet_generator import save_snippets
+from batch_journal import BatchJournal
+
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.mov', '.avi', '.mkv'}
+
+# Masques inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class InotifySource:
+    """Événements fichiers via inotify (Linux uniquement)"""
+
+    def __init__(self, folder):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError("inotify indisponible")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch a échoué")
+        self.folder = Path(folder)
+
+    def wait(self, timeout):
+        """Attend des événements, retourne les chemins modifiés"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        paths = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return paths
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                paths.add(self.folder / os.fsdecode(name))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Repli portable : rescanne le dossier à intervalle régulier"""
+
+    def __init__(self, folder, interval):
+        self.folder = Path(folder)
+        self.interval = interval
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        return {Path(entry.path) for entry in os.scandir(self.folder)
+                if entry.is_file()}
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    def __init__(self, folder, output_dir='watch_output', state_path=None,
+                 settle_seconds=5.0, batch_window=10.0, max_batch=10, poll_interval=2.0,
+                 use_inotify=True):
+        self.folder = Path(folder).resolve()
+        self.output_dir = Path(output_dir)
+        self.state_path = (Path(state_path) if state_path
+                           else self.folder / '.watch_state.json')
+        # Étapes de chaque fichier (blob, commit...) pour reprendre un lot interrompu
+        self.journal = BatchJournal(self.state_path.with_name('.watch_journal.jsonl'))
+        self.settle_seconds = settle_seconds
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+
+        self.uploader = VideoUploader()
+        self.state = self.load_state()
+        self.pending = {}
+        self.ready = []
+        self.last_ready_at = 0.0
+        self.running = False
+        self.once = False
+
+    def load_state(self):
+        """Charge l'état persistant (fichiers déjà traités)"""
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'files': {}, 'hashes': {}}
+
+    def save_state(self):
+        """Sauvegarde l'état de manière atomique"""
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def is_candidate(self, path):
+        """Vidéo pas encore traitée (chemin, taille et date inchangés)"""
+        if path.suffix.lower() not in VIDEO_EXTENSIONS or path.name.startswith('.'):
+            return False
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        known = self.state['files'].get(str(path))
+        return (not known or known['size'] != stat.st_size
+                or known['mtime'] != stat.st_mtime)
+
+    def track(self, paths, now):
+        """Enregistre les fichiers à surveiller jusqu'à stabilisation"""
+        for path in paths:
+            if path in self.pending or any(item['path'] == path for item in self.ready):
+                continue
+            if self.is_candidate(path):
+                self.pending[path] = {'size': -1, 'mtime': -1, 'since': now}
+
+    def check_stability(self, now):
+        """Déplace les fichiers dont la taille ne bouge plus vers le lot prêt"""
+        for path, info in list(self.pending.items()):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime) != (info['size'], info['mtime']):
+                info.update(size=stat.st_size, mtime=stat.st_mtime, since=now)
+            elif now - info['since'] >= self.settle_seconds and stat.st_size > 0:
+                del self.pending[path]
+                self.ready.append({'path': path, 'size': stat.st_size,
+                                   'mtime': stat.st_mtime})
+                self.last_ready_at = now
+                print(f"📥 Prêt: {path.name} ({stat.st_size / (1024 * 1024):.1f} MB)")
+
+    def batch_due(self, now):
+        return bool(self.ready) and (len(self.ready) >= self.max_batch
+                                     or now - self.last_ready_at >= self.batch_window)
+
+    def remember(self, item, **fields):
+        """Marque un fichier comme traité dans l'état persistant"""
+        self.state['files'][str(item['path'])] = {
+            'size': item['size'], 'mtime': item['mtime'], **fields,
+        }
+        if item.get('sha256') and fields.get('status') == 'uploaded':
+            self.state['hashes'][item['sha256']] = fields['filename']
+
+    def prepare(self, item):
+        """Valide, déduplique et prépare un fichier, retourne False pour l'ignorer
+
+        Un fichier verrouillé ou illisible (OSError) n'est pas mémorisé : il
+        repasse par la file de stabilisation pour un nouvel essai. Un contenu
+        invalide est rejeté ; dans les deux cas le reste du lot continue.
+        """
+        try:
+            return self._prepare(item)
+        except OSError as e:
+            print(f"⚠️ {item['path'].name}: {e}, nouvel essai plus tard")
+            if not self.once:
+                self.pending[item['path']] = {'size': -1, 'mtime': -1,
+                                              'since': time.monotonic()}
+            return False
+        except Exception as e:
+            print(f"❌ {item['path'].name}: {e}")
+            self.remember(item, status='rejected', error=str(e) or type(e).__name__)
+            if item.get('filename'):
+                self.journal.fail(item['filename'], e)
+            return False
+
+    def _prepare(self, item):
+        path = item['path']
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        item['sha256'] = digest.hexdigest()
+        if item['sha256'] in self.state['hashes']:
+            print(f"⏭️ {path.name}: contenu déjà uploadé")
+            self.remember(item, status='skipped',
+                          filename=self.state['hashes'][item['sha256']])
+            return False
+
+        try:
+            self.uploader.validate_video(str(path))
+        except (ValueError, FileNotFoundError) as e:
+            print(f"{e} ({path.name})")
+            self.remember(item, status='rejected', error=str(e))
+            return False
+        item['metadata'] = self.uploader.metadata
+
+        item['hashes'], duplicates = self.uploader.check_duplicates(str(path))
+        if duplicates:
+            print(f"♊ {path.name}: quasi-doublon de {duplicates[0]['name']}, ignoré")
+            self.remember(item, status='duplicate', duplicate_of=duplicates[0]['name'])
+            return False
+
+        # Un lot interrompu garde son nom de fichier et ses blobs déjà créés
+        identity = {'source': str(path), 'size': item['size'], 'mtime': item['mtime']}
+        item['filename'] = self.journal.find(**identity)
+        if item['filename'] is None:
+            item['filename'] = self.uploader.generate_filename(str(path))
+            self.journal.record(item['filename'], 'hashed', sha256=item['sha256'],
+                                **identity)
+        item['upload_path'] = str(path)
+        if not self.journal.step(item['filename'], 'blob'):
+            item['upload_path'] = self.uploader.prepare_faststart(str(path))
+        return True
+
+    def flush(self):
+        """Traite le lot prêt : un seul commit pour au plus max_batch vidéos
+
+        Les fichiers au-delà de max_batch restent dans la file pour le lot suivant.
+        """
+        batch, self.ready = self.ready[:self.max_batch], self.ready[self.max_batch:]
+        print(f"\n🚚 Traitement d'un lot de {len(batch)} fichier(s)")
+
+        prepared = [item for item in batch if self.prepare(item)]
+        try:
+            if prepared:
+                self.uploader.upload_batch_to_github(
+                    [(item['upload_path'], item['filename']) for item in prepared],
+                    journal=self.journal)
+                for item in prepared:
+                    committed = self.journal.step(item['filename'], 'committed')
+                    self.publish(item, committed['commit'])
+        except Exception as e:
+            # Remettre les fichiers dans la file : nouvel essai après batch_window
+            print(f"❌ Erreur lors de l'upload du lot: {e}")
+            self.ready.extend({'path': item['path'], 'size': item['size'],
+                               'mtime': item['mtime']}
+                              for item in prepared
+                              if str(item['path']) not in self.state['files'])
+            self.last_ready_at = time.monotonic()
+        finally:
+            for item in prepared:
+                if item['upload_path'] != str(item['path']):
+                    os.remove(item['upload_path'])
+            self.save_state()
+
+    def publish(self, item, commit_sha):
+        """Catalogue, empreinte, URL et snippets d'une vidéo uploadée"""
+        filename = item['filename']
+        self.uploader.metadata = item['metadata']
+        self.uploader.finish_upload(filename, item['hashes'])
+
+        url = self.uploader.generate_jsdelivr_url(filename)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        save_snippets(filename, self.uploader.generate_snippets(filename),
+                      self.output_dir)
+        with open(self.output_dir / 'urls.txt', 'a', encoding='utf-8') as f:
+            timestamp = datetime.now().isoformat(timespec='seconds')
+            f.write(f"{timestamp}\t{item['path'].name}\t{url}\n")
+
+        self.remember(item, status='uploaded', filename=filename, url=url,
+                      commit=commit_sha)
+        self.journal.record(filename, 'snippet', url=url)
+        print(f"🔗 {item['path'].name} → {url}")
+
+    def open_source(self):
+        if self.use_inotify:
+            try:
+                source = InotifySource(self.folder)
+                print("👀 Surveillance via inotify")
+                return source
+            except OSError as e:
+                print(f"⚠️ inotify indisponible ({e}), repli sur le polling")
+        print(f"👀 Surveillance par polling ({self.poll_interval}s)")
+        return PollingSource(self.folder, self.poll_interval)
+
+    def initial_scan(self, now):
+        self.track({Path(entry.path) for entry in os.scandir(self.folder)
+                    if entry.is_file()}, now)
+
+    def run(self, once=False):
+        """Boucle principale (once : traite les fichiers présents puis s'arrête)"""
+        print(f"📂 Dossier surveillé: {self.folder}")
+        print(f"📄 Sorties: {self.output_dir}")
+        self.running = True
+        self.once = once
+        source = None if once else self.open_source()
+        self.initial_scan(time.monotonic())
+
+        try:
+            while self.running:
+                if once:
+                    time.sleep(min(self.settle_seconds, 1.0))
+                    changed = set()
+                else:
+                    changed = source.wait(min(self.poll_interval, self.settle_seconds))
+                now = time.monotonic()
+                self.track(changed, now)
+                self.check_stability(now)
+                if once and not self.pending:
+                    # Un commit par tranche de max_batch fichiers
+                    for _ in range(-(-len(self.ready) // self.max_batch)):
+                        self.flush()
+                    break
+                if self.batch_due(now):
+                    self.flush()
+        finally:
+            if source:
+                source.close()
+        return self.state
+
+    def stop(self, *_):
+        print("\n🛑 Arrêt demandé, fin du lot en cours...")
+        self.running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Upload automatique des vidéos d'un dossier")
+    parser.add_argument('folder', help="dossier à surveiller")
+    parser.add_argument('--output', default='watch_output',
+                        help="dossier des URLs et snippets générés")
+    parser.add_argument('--state',
+                        help="fichier d'état (défaut: <folder>/.watch_state.json)")
+    parser.add_argument('--settle', type=float, default=5.0,
+                        help="secondes sans changement de taille avant upload")
+    parser.add_argument('--batch-window', type=float, default=10.0,
+                        help="secondes d'attente pour regrouper les fichiers")
+    parser.add_argument('--max-batch', type=int, default=10,
+                        help="nombre max de vidéos par commit")
+    parser.add_argument('--poll', action='store_true',
+                        help="forcer le polling au lieu d'inotify")
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--once', action='store_true',
+                        help="traiter les fichiers présents puis quitter")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        print(f"❌ Dossier introuvable: {args.folder}")
+        sys.exit(1)
+
+    watcher = FolderWatcher(args.folder, args.output, args.state, args.settle,
+                            args.batch_window, args.max_batch, args.poll_interval,
+                            use_inotify=not args.poll)
+    signal.signal(signal.SIGINT, watcher.stop)
+    signal.signal(signal.SIGTERM, watcher.stop)
+    watcher.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
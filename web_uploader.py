@@ -5,23 +5,53 @@ Serveur Flask avec upload par drag & drop
 """
 
 import os
+import re
+import math
 import json
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+import time
+import asyncio
+import threading
+from flask import (Flask, render_template, request, jsonify, redirect, url_for,
+                   send_file, abort)
 from werkzeug.utils import secure_filename
 from pathlib import Path
+import shutil
 import tempfile
 from upload_video import VideoUploader
 from manage_videos import VideoManager
+from catalog import VideoCatalog
+from config import DEFAULT_CONFIG
+from preview_cache import PreviewCache
+from snippet_generator import mime_type
+from cdn_verify import verify_videos
 
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max
+# Les fichiers au-delà de 50MB ne sont acceptés qu'avec l'optimisation
+app.config['MAX_CONTENT_LENGTH'] = DEFAULT_CONFIG['max_optimize_input_mb'] * 1024 * 1024
 
 # Configuration
 UPLOAD_FOLDER = 'temp_uploads'
 ALLOWED_EXTENSIONS = {'.mp4', '.webm', '.mov', '.avi', '.mkv'}
 
+# Délai max pour vérifier qu'une vidéo en cache est arrivée sur jsDelivr
+CDN_CHECK_TIMEOUT = 3
+
+# Hashs acceptés par requête de recherche (SHA-1 au format blob git)
+MAX_LOOKUP_HASHES = 1000
+SHA_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+
+# Durée de validité de l'index des hashs (un upload ou une suppression l'invalide)
+CONTENT_INDEX_TTL = 300
+
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Copies locales des derniers uploads, servies en attendant jsDelivr
+preview_cache = PreviewCache()
+
+# Index SHA → vidéo (nom, chemin), partagé entre les requêtes /lookup
+content_index = {'index': None, 'built': 0.0}
+content_index_lock = threading.Lock()
+
 def allowed_file(filename):
     """Vérifie si le fichier est autorisé"""
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
@@ -38,23 +68,134 @@ def gallery():
         manager = VideoManager()
         videos = manager.list_videos()
         
-        # Transformer pour le template
+        catalog = VideoCatalog()
+        pending = confirm_cdn_copies(manager, videos)
+
+        # Transformer pour le template (avec les métadonnées du catalogue)
         video_list = []
         for video in videos:
+            metadata = catalog.get(video['name']) or {}
+            cdn_url = manager.video_url(video['name'])
             video_list.append({
                 'name': video['name'],
                 'size_mb': round(video['size'] / (1024 * 1024), 1),
-                'url': f"https://cdn.jsdelivr.net/gh/{manager.config.github_username}/{manager.config.github_repo}@main/videos/{video['name']}",
-                'sha': video['sha'][:8]
+                'url': cdn_url,
+                'preview_url': (url_for('preview', filename=video['name'])
+                                if video['name'] in pending else cdn_url),
+                'cdn_pending': video['name'] in pending,
+                'sha': video['sha'][:8],
+                'resolution': (f"{metadata['width']}x{metadata['height']}"
+                               if metadata.get('width') else None),
+                'duration': metadata.get('duration'),
+                'has_audio': metadata.get('has_audio')
             })
         
         return render_template('gallery.html', videos=video_list)
     except Exception as e:
         return render_template('gallery.html', videos=[], error=str(e))
 
+
+def confirm_cdn_copies(manager, videos):
+    """Vérifie sur jsDelivr les vidéos encore en cache, retourne celles en attente
+
+    Une vidéo est confirmée quand jsDelivr la sert avec la taille (et l'ETag
+    éventuel) attendus ; la galerie repasse alors sur l'URL CDN.
+    """
+    listed = {video['name']: video for video in videos}
+    entries = [listed[name] for name in preview_cache.pending() if name in listed]
+    if not entries:
+        return set()
+
+    try:
+        results = asyncio.run(verify_videos(entries, manager.video_url, concurrency=4,
+                                            timeout=CDN_CHECK_TIMEOUT))
+    except Exception:
+        return {entry['name'] for entry in entries}
+
+    pending = set()
+    for result in results:
+        if result['status'] in ('ok', 'slow'):
+            preview_cache.confirm(result['name'])
+        else:
+            pending.add(result['name'])
+    return pending
+
+
+@app.route('/preview/<path:filename>')
+def preview(filename):
+    """Sert une vidéo depuis le cache local (Range, ETag, Cache-Control)"""
+    entry = preview_cache.get(filename)
+    if entry is None:
+        abort(404)
+
+    # Le nom contient un hash du contenu : la réponse ne change jamais
+    response = send_file(preview_cache.path_for(filename).resolve(),
+                         mimetype=mime_type(filename), conditional=True,
+                         etag=entry['sha'], max_age=3600)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+
+def build_content_index(manager, catalog):
+    """Index SHA git → vidéo (nom, chemin), construit depuis le listing du repository
+
+    Les SHA des fichiers d'origine notés dans le catalogue (avant faststart ou
+    optimisation) pointent aussi vers la vidéo uploadée.
+    """
+    index = {}
+    for video in manager.fetch_videos():
+        match = {'filename': video['name'], 'path': video['path']}
+        index[video['sha']] = match
+        source_sha = (catalog.get(video['name']) or {}).get('source_sha')
+        if source_sha:
+            index.setdefault(source_sha, match)
+    return index
+
+
+def cached_content_index(manager):
+    """Index des hashs, reconstruit au plus une fois par CONTENT_INDEX_TTL"""
+    with content_index_lock:
+        if (content_index['index'] is None
+                or time.time() - content_index['built'] > CONTENT_INDEX_TTL):
+            content_index['index'] = build_content_index(manager, VideoCatalog())
+            content_index['built'] = time.time()
+        return content_index['index']
+
+
+def invalidate_content_index():
+    with content_index_lock:
+        content_index['index'] = None
+
+
+@app.route('/lookup', methods=['POST'])
+def lookup_hashes():
+    """Indique lesquels des hashs envoyés par le navigateur sont déjà en ligne"""
+    hashes = (request.get_json(silent=True) or {}).get('hashes')
+    if not isinstance(hashes, list) or not all(
+            isinstance(h, str) and SHA_PATTERN.match(h) for h in hashes):
+        return jsonify({'error': 'Liste de SHA-1 attendue'}), 400
+    if len(hashes) > MAX_LOOKUP_HASHES:
+        return jsonify({'error': f'Trop de fichiers (max: {MAX_LOOKUP_HASHES})'}), 400
+
+    try:
+        manager = VideoManager()
+        index = cached_content_index(manager)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    known = {sha: {'filename': index[sha]['filename'],
+                   'url': manager.video_url(index[sha]['filename'],
+                                            path=index[sha]['path'])}
+             for sha in hashes if sha in index}
+    return jsonify({'known': known,
+                    'missing': [sha for sha in hashes if sha not in index]})
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Endpoint pour l'upload de fichiers"""
+    temp_dir = None
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'Aucun fichier sélectionné'}), 400
@@ -66,46 +207,79 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': f'Format non supporté. Utilisez: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
         
-        # Sauvegarder temporairement
+        # Sauvegarder temporairement, dans un dossier propre à la requête : des uploads
+        # parallèles peuvent porter le même nom (mêmes noms dans deux sous-dossiers)
         filename = secure_filename(file.filename)
-        temp_path = os.path.join(UPLOAD_FOLDER, filename)
+        temp_dir = tempfile.mkdtemp(dir=UPLOAD_FOLDER)
+        temp_path = os.path.join(temp_dir, filename)
         file.save(temp_path)
         
         # Vérifier la taille
         size_mb = os.path.getsize(temp_path) / (1024 * 1024)
-        if size_mb > 50:
-            os.remove(temp_path)
-            return jsonify({'error': f'Fichier trop volumineux: {size_mb:.1f}MB (max: 50MB)'}), 400
+        optimize = request.form.get('optimize') == '1'
+        if size_mb > DEFAULT_CONFIG['max_file_size_mb'] and not optimize:
+            return jsonify({'error': f'Fichier trop volumineux: {size_mb:.1f}MB '
+                                     '(max: 50MB, activez l\'optimisation)'}), 400
         
-        # Générer le filename avant l'upload
-        uploader = VideoUploader()
-        generated_filename = uploader.generate_filename(temp_path)
+        # Options d'optimisation (budget optionnel, audio retiré par défaut)
+        optimize_options = None
+        if optimize:
+            try:
+                target_mb = float(request.form.get('target_mb') or 0)
+            except ValueError:
+                target_mb = -1
+            if not math.isfinite(target_mb) or target_mb < 0:
+                return jsonify({'error': 'Budget invalide: '
+                                         'indiquez une taille en MB (ex: 8)'}), 400
+            optimize_options = {
+                'target_size': int(target_mb * 1024 * 1024) if target_mb > 0 else None,
+                'muted': request.form.get('keep_audio') != '1'
+            }
         
-        # Upload vers GitHub
-        success = uploader.upload(temp_path)
-        
-        # Nettoyer le fichier temporaire
-        os.remove(temp_path)
+        # Upload vers GitHub. L'optimisation (recherche CRF : environ 6 encodages
+        # ffmpeg par résolution essayée) s'exécute dans la requête : la réponse
+        # peut prendre plusieurs minutes pour une longue vidéo
+        uploader = VideoUploader()
+        success = uploader.upload(temp_path,
+                                  allow_duplicates=request.form.get('force') == '1',
+                                  optimize=optimize_options,
+                                  on_uploaded=preview_cache.add)
         
         if success:
+            invalidate_content_index()
+
             # Générer l'URL jsDelivr
-            jsdelivr_url = uploader.generate_jsdelivr_url(generated_filename)
+            jsdelivr_url = uploader.generate_jsdelivr_url(uploader.filename)
+
+            optimization = None
+            if uploader.optimization:
+                optimization = {key: uploader.optimization[key] for key in
+                                ('original_size', 'optimized_size', 'saved', 'crf',
+                                 'height', 'ssim', 'warnings')}
+                size_mb = uploader.optimization['optimized_size'] / (1024 * 1024)
             
             return jsonify({
                 'success': True,
                 'message': 'Vidéo uploadée avec succès!',
                 'url': jsdelivr_url,
-                'filename': generated_filename,
-                'size_mb': size_mb
+                'preview_url': url_for('preview', filename=uploader.filename),
+                'filename': uploader.filename,
+                'size_mb': size_mb,
+                'optimization': optimization
             })
+        elif uploader.duplicates:
+            names = ', '.join(match['name'] for match in uploader.duplicates)
+            return jsonify({'error': f'Quasi-doublon de: {names}',
+                            'duplicates': uploader.duplicates}), 409
         else:
             return jsonify({'error': 'Erreur lors de l\'upload vers GitHub'}), 500
             
     except Exception as e:
-        # Nettoyer en cas d'erreur
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
         return jsonify({'error': str(e)}), 500
+    finally:
+        # Nettoyer le fichier temporaire
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 @app.route('/delete/<filename>', methods=['DELETE'])
 def delete_video(filename):
@@ -115,6 +289,8 @@ def delete_video(filename):
         success = manager.delete_video(filename)
         
         if success:
+            preview_cache.remove(filename)
+            invalidate_content_index()
             return jsonify({'success': True, 'message': f'{filename} supprimé'})
         else:
             return jsonify({'error': 'Erreur lors de la suppression'}), 500